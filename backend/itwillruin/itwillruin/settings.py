@@ -44,13 +44,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves static files before the rest of the stack runs (see STORAGES below).
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'itwillruin.urls'
@@ -122,7 +123,188 @@ STATIC_URL = 'static/'
 
 STATICFILES_DIRS = [BASE_DIR / "static"] 
 
-storage = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# manage.py collectstatic copies the files here with hashed names, plus gzip
+# and brotli (if the Brotli package is installed) variants. WhiteNoise serves
+# hashed files with far-future immutable cache headers and other files for
+# WHITENOISE_MAX_AGE seconds.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+WHITENOISE_MAX_AGE = 0 if DEBUG else 60 * 60
+
+# Per-process cache used for the cached template-only pages (home, map, about),
+# which are kept for PAGE_CACHE_SECONDS.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'itwillruin-pages',
+    },
+    # Status of queued and failed PDF reports (see REPORT_JOB_TTL). It must be
+    # shared by all server processes, e.g. Redis or Memcached, when the app runs
+    # with several workers; otherwise a report can only be polled on the worker
+    # that queued it.
+    'reports': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'itwillruin-reports',
+    },
+}
+
+PAGE_CACHE_SECONDS = 10 * 60
+
+# Weather forecasting
+# Local store for downloaded NASA POWER history and other forecast artifacts.
+
+WEATHER_DATA_DIR = BASE_DIR / 'weather_data'
+
+# Default forecasting model: 'sarimax' (per-variable SARIMAX fits) or
+# 'harmonic' (batched least-squares harmonic regression, much faster).
+# Requests can override it with an 'engine' parameter.
+FORECAST_ENGINE = 'sarimax'
+
+# Number of worker processes used to fit the per-variable forecast models.
+# None uses one process per forecast variable, capped at the CPU count.
+FORECAST_FIT_WORKERS = None
+
+# Fitted model parameters are reused for each location and only fully
+# re-optimised once they are older than this many days.
+FORECAST_REFIT_AFTER_DAYS = 7
+
+# SARIMAX training window: each variable is fitted on only its last N days of
+# history, so fit time stays flat as the history grows. 'auto' picks N from
+# the forecast horizon (see weather_model.training_window_days) and None uses
+# all history. FORECAST_TRAINING_WINDOWS overrides it per variable, e.g.
+# {'PRECTOTCORR': 730}. Compare choices with manage.py evaluate_training_window.
+FORECAST_TRAINING_WINDOW = 'auto'
+
+FORECAST_TRAINING_WINDOWS = {}
+
+# How the full history still informs a windowed fit: 'deseasonalize' removes
+# an annual cycle fitted over all years before the SARIMAX fit and adds it
+# back to the forecast; None fits the raw window.
+FORECAST_SEASONAL_TERMS = 'deseasonalize'
+
+# Forecast paths are computed at least this many days ahead and cached, so
+# nearby dates at the same location are answered without refitting.
+FORECAST_MIN_HORIZON_DAYS = 14
+
+# Longest date range (in days) that can be requested from /weather_api/.
+FORECAST_MAX_RANGE_DAYS = 31
+
+# Batch forecast API (/weather_api/batch/): largest accepted list of events
+# and number of events processed at the same time.
+FORECAST_BATCH_MAX_ITEMS = 100
+
+FORECAST_BATCH_CONCURRENCY = 8
+
+# Day-of-year climatology: statistics for a date use all years within this
+# many days of it. A day with at least RAIN_DAY_THRESHOLD_MM of rain counts
+# as rainy.
+CLIMATOLOGY_WINDOW_DAYS = 7
+
+RAIN_DAY_THRESHOLD_MM = 1.0
+
+# Directory of GPM IMERG daily precipitation files (.nc4), extracted per grid
+# cell by manage.py ingest_imerg. A cell's IMERG rainy-day frequency for the
+# date is blended into the rain chance with IMERG_RAIN_CHANCE_WEIGHT (0-1).
+IMERG_DATA_DIR = None
+
+IMERG_RAIN_CHANCE_WEIGHT = 0.5
+
+# Completed forecasts are stored in the History table and reused for the same
+# grid cell, date and event for this many seconds.
+FORECAST_RESULT_TTL = 6 * 60 * 60
+
+# Cache warming (manage.py warm_forecast_cache): the most requested History
+# locations plus these (lat, lon) pairs are refreshed and pre-fitted ahead of demand.
+FORECAST_WARM_LOCATIONS = []
+
+FORECAST_WARM_TOP_LOCATIONS = 20
+
+FORECAST_WARM_CONCURRENCY = 2
+
+# PDF event reports (/reports/) are rendered by this many worker processes.
+REPORT_WORKERS = 2
+
+# Seconds a queued or failed report status is kept in the 'reports' cache. A
+# report still rendering after this long is reported as unknown; a failed one
+# can be queued again once its status expires or by asking for it again.
+# Rendered PDFs not asked for in this long are deleted from disk.
+REPORT_JOB_TTL = 60 * 60
+
+# Upstream service endpoints. They can point at local stand-ins for load
+# testing (see manage.py fake_upstreams). GEMINI_BASE_URL None uses Google's API.
+
+POWER_DAILY_POINT_URL = 'https://power.larc.nasa.gov/api/temporal/daily/point'
+
+NOMINATIM_REVERSE_URL = 'https://nominatim.openstreetmap.org/reverse'
+
+GEMINI_BASE_URL = None
+
+# Shared HTTP client used for NASA POWER and Nominatim requests.
+# Timeouts are in seconds; failed requests are retried with exponential backoff.
+
+HTTP_USER_AGENT = 'itwillruin/1.0 (django-app)'
+
+HTTP_TIMEOUT = 60
+
+HTTP_CONNECT_TIMEOUT = 10
+
+HTTP_MAX_CONNECTIONS = 100
+
+HTTP_MAX_CONNECTIONS_PER_HOST = 10
+
+HTTP_RETRIES = 3
+
+HTTP_RETRY_BACKOFF = 0.5
+
+# Upper bound for a single retry delay, including one asked for by an upstream
+# Retry-After header.
+HTTP_MAX_RETRY_DELAY = 30
+
+# Reverse geocoding cache. Any point within GEOCODE_CACHE_RADIUS_KM of a
+# previously resolved point reuses its name. GEOCODE_GAZETTEER_PATH may point
+# to a CSV file with name,lat,lon columns that is searched first, offline.
+# Points Nominatim has no name for are remembered as "Unknown" for
+# GEOCODE_UNKNOWN_TTL seconds only, so they are asked about again later.
+
+GEOCODE_CACHE_RADIUS_KM = 5
+
+GEOCODE_UNKNOWN_TTL = 60 * 60
+
+GEOCODE_GAZETTEER_PATH = None
+
+GEOCODE_GAZETTEER_RADIUS_KM = 15
+
+# Gemini model and thinking budget (tokens) that generate all AI dashboard
+# sections in one call. These are the settings the weather analysis always
+# used; 'gemini-2.5-flash' with a budget of 0 answers faster and cheaper, with
+# less considered advice.
+
+LLM_MODEL = 'gemini-2.5-pro'
+
+LLM_THINKING_BUDGET = 1000
+
+# Cache for Gemini results, keyed on bucketed weather inputs.
+# LLM_CACHE_TTL is in seconds.
+
+LLM_CACHE_MAX_ENTRIES = 1024
+
+LLM_CACHE_TTL = 6 * 60 * 60
+
+# Deadlines (in seconds) for the external calls made while rendering the
+# dashboard. A section that misses its deadline is rendered with a fallback.
+
+DASHBOARD_GEOCODE_TIMEOUT = 5
+
+DASHBOARD_LLM_TIMEOUT = 20
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
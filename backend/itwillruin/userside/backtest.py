@@ -0,0 +1,90 @@
+"""
+Rolling-origin backtest of the SARIMAX training window, run by the
+`evaluate_training_window` command.
+
+For each origin (a cutoff date in the recent past), a variable is trained on the
+history up to that date with a given training window and seasonal terms, and its
+forecast is compared with what was then observed. The mean absolute error per
+horizon and the fit time show what a window choice costs in accuracy and what it
+saves in time.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+
+from . import weather_model
+
+
+def backtest_origins(index, origins, spacing_days, steps):
+    """
+    Returns `origins` cutoff dates, `spacing_days` apart, the latest leaving
+    `steps` observed days after it for scoring.
+    """
+    last = index.max() - timedelta(days=steps)
+    return sorted(last - timedelta(days=spacing_days * i) for i in range(origins))
+
+
+def evaluate_origin(series, origin, steps, window, seasonal_terms):
+    """
+    Trains on the series up to `origin` and forecasts `steps` days.
+    Runs in a fit worker.
+
+    Returns:
+        A tuple of (absolute errors for days 1..steps, fit seconds).
+    """
+    train = series.loc[:origin]
+    started = time.perf_counter()
+    path = weather_model.forecast_daily_path(train, steps, window=window, seasonal_terms=seasonal_terms)
+    seconds = time.perf_counter() - started
+    actual = series.reindex(path.index).to_numpy()
+    return np.abs(path['mean'].to_numpy() - actual), seconds
+
+
+def evaluate(historical_df, windows, seasonal_options, horizons, origins=6, spacing_days=30,
+             variables=weather_model.FORECAST_VARIABLES, executor=None):
+    """
+    Backtests every combination of variable, window and seasonal terms.
+
+    Args:
+        windows: Window choices as accepted by `weather_model.training_window_days`
+            (days, 'auto' or 'all'). 'auto' is resolved for the longest horizon.
+        executor: A process pool to run the fits in; they run here if None.
+
+    Returns:
+        A list of result dicts with the MAE for each horizon and the mean fit time.
+    """
+    steps = max(horizons)
+    history = historical_df.ffill()
+    cutoffs = backtest_origins(history.index, origins, spacing_days, steps)
+
+    runs = []
+    for var in variables:
+        for window in windows:
+            days = weather_model.training_window_days(var, steps, window)
+            for seasonal_terms in seasonal_options:
+                args = [(history[var], origin, steps, days, seasonal_terms) for origin in cutoffs]
+                if executor is not None:
+                    futures = [executor.submit(evaluate_origin, *arg) for arg in args]
+                else:
+                    futures = [evaluate_origin(*arg) for arg in args]
+                runs.append(({'variable': var, 'window': window, 'training_days': days,
+                              'seasonal_terms': seasonal_terms}, futures))
+
+    results = []
+    for result, futures in runs:
+        outcomes = [future.result() if executor is not None else future for future in futures]
+        errors = np.vstack([errors for errors, _ in outcomes])
+        result['mae'] = {str(h): round(float(np.nanmean(errors[:, h - 1])), 4) for h in horizons}
+        result['fit_seconds_mean'] = round(float(np.mean([seconds for _, seconds in outcomes])), 4)
+        results.append(result)
+    return results
+
+
+def evaluate_in_pool(historical_df, windows, seasonal_options, horizons, workers=None, **kwargs):
+    """Runs `evaluate` with the fits spread over a process pool like the forecast's own."""
+    workers = workers or min(len(weather_model.FORECAST_VARIABLES), multiprocessing.cpu_count())
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return evaluate(historical_df, windows, seasonal_options, horizons, executor=executor, **kwargs)
@@ -0,0 +1,341 @@
+"""
+Offline benchmark of the forecast pipeline, run by the `benchmark_forecast` command.
+
+Upstream services are replaced by a replayed NASA POWER daily point response (the
+fixture) and a stub Gemini client, so runs are repeatable and need no network or
+API key. The benchmark times each stage of `get_weather_prediction_for_day` on its
+own, and `weather_forecast_api` end to end, for several history lengths and
+forecast horizons.
+
+The default fixture is committed with the app (BUNDLED_FIXTURE_PATH): seven
+years of Cairo history, so every run replays the same values on any machine. Its
+four temperature and rain parameters are the NASA POWER values of the bundled
+Cairo dataset; the three parameters that dataset lacks are synthetic (see the
+fixture's header). A live response can be recorded with `benchmark_forecast
+--record` and replayed with --fixture.
+"""
+import asyncio
+import gzip
+import json
+import multiprocessing
+import platform
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from . import climatology, http_client, llm_cache, weather_model
+
+BENCHMARK_LAT = 30.0444
+BENCHMARK_LON = 31.2357
+BENCHMARK_EVENT = '__benchmark__'
+BENCHMARK_CITY = 'Benchmark City'
+
+STUB_INSIGHTS = {
+    'summary': "Benchmark summary.",
+    'parade_planner': {
+        'overall_outlook': "Good",
+        'clothing_recommendation': "Light layers.",
+        'contingency_plan': "Keep a tent nearby.",
+    },
+    'nasa_fun_fact': "Benchmark fact.",
+    'what_to_wear': "Light layers.",
+    'activity_recommendation': "Go ahead as planned.",
+}
+
+
+BUNDLED_FIXTURE_PATH = Path(__file__).resolve().parent / 'benchmark_data' / 'power_daily_cairo.json.gz'
+
+
+def benchmarks_dir():
+    """Returns where recorded fixtures and benchmark results are written."""
+    return Path(settings.WEATHER_DATA_DIR) / 'benchmarks'
+
+
+def synthetic_power_response(start, end, seed=0):
+    """
+    Builds a NASA POWER daily point response with seasonal, noisy values for every
+    parameter in POWER_PARAMETERS, including a few missing (-999) days.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, end, freq='D')
+    season = np.cos(2 * np.pi * (days.dayofyear.to_numpy() - 200) / 365.25)
+    n = len(days)
+    values = {
+        'T2M': 22 + 7 * season + rng.normal(0, 1.5, n),
+        'PRECTOTCORR': np.where(rng.random(n) < 0.08 - 0.06 * season, rng.gamma(0.8, 4, n), 0.0),
+        'WS10M': np.clip(3.5 + rng.normal(0, 1, n), 0, None),
+        'RH2M': np.clip(50 - 10 * season + rng.normal(0, 8, n), 5, 100),
+        'ALLSKY_SFC_UVA': np.clip(20 + 8 * season + rng.normal(0, 2, n), 0, None),
+    }
+    values['T2M_MAX'] = values['T2M'] + 6 + rng.normal(0, 1, n)
+    values['T2M_MIN'] = values['T2M'] - 6 + rng.normal(0, 1, n)
+
+    dates = days.strftime('%Y%m%d')
+    parameter = {}
+    for name in weather_model.POWER_PARAMETERS.split(','):
+        series = np.round(values[name], 2)
+        series[rng.random(n) < 0.002] = -999
+        parameter[name] = dict(zip(dates, series.tolist()))
+    return {'properties': {'parameter': parameter}, 'header': {'source': 'synthetic'}}
+
+
+def _open_fixture(path, mode):
+    return gzip.open(path, mode) if Path(path).suffix == '.gz' else open(path, mode)
+
+
+def load_fixture(path=BUNDLED_FIXTURE_PATH):
+    """Loads a NASA POWER response saved as JSON (gzipped if the name ends in .gz)."""
+    with _open_fixture(path, 'rt') as f:
+        return json.load(f)
+
+
+def save_fixture(path, response):
+    """Stores a NASA POWER response as a benchmark fixture."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _open_fixture(path, 'wt') as f:
+        json.dump(response, f)
+
+
+def fixture_source(response):
+    """Returns where a fixture came from: 'bundled', 'synthetic' or 'recorded'."""
+    return response.get('header', {}).get('source', 'recorded')
+
+
+async def record_fixture(path, lat=BENCHMARK_LAT, lon=BENCHMARK_LON, years=6):
+    """Downloads a live NASA POWER response to replay in later benchmark runs."""
+    end = datetime.now() - timedelta(days=1)
+    start = end - timedelta(days=int(years * 365.25))
+    response = await http_client.get_json(settings.POWER_DAILY_POINT_URL, params={
+        'parameters': weather_model.POWER_PARAMETERS,
+        'start': start.strftime('%Y%m%d'),
+        'end': end.strftime('%Y%m%d'),
+        'latitude': lat,
+        'longitude': lon,
+        'community': 'AG',
+        'format': 'JSON',
+    })
+    response.setdefault('header', {})['source'] = 'recorded'
+    save_fixture(path, response)
+    return response
+
+
+def slice_response(response, end, years):
+    """
+    Returns the last `years` years of a recorded response, with the dates shifted so
+    that its last day falls on `end`.
+    """
+    parameter = response['properties']['parameter']
+    dates = pd.to_datetime(sorted(next(iter(parameter.values()))), format='%Y%m%d')
+    shift = pd.Timestamp(end).normalize() - dates[-1]
+    keep = dates[dates + shift > pd.Timestamp(end) - pd.DateOffset(years=years)]
+    mapping = {day.strftime('%Y%m%d'): (day + shift).strftime('%Y%m%d') for day in keep}
+    return {'properties': {'parameter': {
+        name: {mapping[day]: value for day, value in values.items() if day in mapping}
+        for name, values in parameter.items()
+    }}}
+
+
+class ReplayUpstreams:
+    """
+    Stands in for the upstream services while a benchmark runs: NASA POWER requests
+    are answered from the fixture (limited to `years` of history) and Nominatim with
+    a fixed place name.
+    """
+
+    def __init__(self, response, years):
+        self.response = response
+        self.years = years
+        self.calls = 0
+
+    async def get_json(self, url, params=None, headers=None):
+        self.calls += 1
+        if url == settings.POWER_DAILY_POINT_URL:
+            end = pd.Timestamp(params['end'])
+            sliced = slice_response(self.response, end, self.years)
+            start = params['start']
+            for name, values in sliced['properties']['parameter'].items():
+                sliced['properties']['parameter'][name] = {day: v for day, v in values.items() if day >= start}
+            return sliced
+        return {'address': {'city': BENCHMARK_CITY}}
+
+
+class StubGeminiClient:
+    """A Gemini client whose generate_content call returns fixed insights at once."""
+
+    class _Models:
+        def generate_content(self, **kwargs):
+            class Response:
+                text = json.dumps(STUB_INSIGHTS)
+            return Response()
+
+    def __init__(self):
+        self.models = self._Models()
+
+
+@contextmanager
+def patched_upstreams(upstreams):
+    """Routes the HTTP client and Gemini client to the benchmark stubs."""
+    # Imported here: this module is also loaded by the fit workers, before the app registry is ready.
+    from . import utils
+
+    saved = (http_client.get_json, utils.get_json, utils._client)
+    http_client.get_json = utils.get_json = upstreams.get_json
+    utils._client = StubGeminiClient()
+    try:
+        yield upstreams
+    finally:
+        http_client.get_json, utils.get_json, utils._client = saved
+
+
+def _use_data_dir(path):
+    settings.WEATHER_DATA_DIR = path
+
+
+@contextmanager
+def isolated_data_dir(path):
+    """
+    Points WEATHER_DATA_DIR at `path` in this process and in a dedicated fit pool, so
+    benchmark runs start with empty caches and leave the real store untouched.
+    """
+    saved_dir, saved_executor = settings.WEATHER_DATA_DIR, weather_model._fit_executor
+    settings.WEATHER_DATA_DIR = path
+    executor = ProcessPoolExecutor(
+        max_workers=len(weather_model.FORECAST_VARIABLES),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_use_data_dir, initargs=(str(path),),
+    )
+    # Start the workers now, so process start-up is not counted in the first timing.
+    list(executor.map(_use_data_dir, [str(path)] * len(weather_model.FORECAST_VARIABLES)))
+    weather_model._fit_executor = executor
+    try:
+        yield
+    finally:
+        executor.shutdown()
+        settings.WEATHER_DATA_DIR, weather_model._fit_executor = saved_dir, saved_executor
+
+
+def timed(func, *args, **kwargs):
+    """Calls func and returns (result, elapsed seconds)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def summarize(samples):
+    """Reduces timing samples (seconds) to their count, minimum, median and maximum."""
+    return {
+        'runs': len(samples),
+        'min_s': round(min(samples), 6),
+        'median_s': round(statistics.median(samples), 6),
+        'max_s': round(max(samples), 6),
+    }
+
+
+def benchmark_stages(response, years, horizon, repeat=1):
+    """
+    Times the stages of `get_weather_prediction_for_day` separately on `years` of
+    replayed history, forecasting `horizon` days ahead.
+
+    Returns:
+        A dict mapping stage names to timing summaries.
+    """
+    end = pd.Timestamp((datetime.now() - timedelta(days=1)).date())
+    sliced = slice_response(response, end, years)
+    samples = {}
+
+    def add(stage, seconds):
+        samples.setdefault(stage, []).append(seconds)
+
+    for _ in range(repeat):
+        df, seconds = timed(weather_model.power_json_to_dataframe, sliced)
+        add('json_to_dataframe', seconds)
+        df = df.ffill()
+
+        fitted = {}
+        for var in weather_model.FORECAST_VARIABLES:
+            path, seconds = timed(weather_model.forecast_daily_path, df[var], horizon,
+                                  **weather_model.training_options(var, horizon))
+            fitted[var] = float(path['mean'].iloc[-1])
+            add(f'fit_sarimax.{var}', seconds)
+        add('fit_sarimax.total', sum(samples[f'fit_sarimax.{var}'][-1] for var in weather_model.FORECAST_VARIABLES))
+
+        _, seconds = timed(weather_model.forecast_harmonic_path, df, horizon)
+        add('fit_harmonic.total', seconds)
+
+        target_date = end + timedelta(days=horizon)
+        table, seconds = timed(climatology.compute_rows, df, climatology.DAYS_OF_YEAR, settings.CLIMATOLOGY_WINDOW_DAYS)
+        add('climatology_table', seconds)
+        _, seconds = timed(weather_model.get_historical_averages, table, target_date)
+        add('historical_averages', seconds)
+
+        fitted['rain_chance_percent'] = min(int(fitted['PRECTOTCORR'] * 20), 100)
+        _, seconds = timed(weather_model.simulate_hourly_forecast, fitted)
+        add('hourly_simulation', seconds)
+
+    return {stage: summarize(values) for stage, values in samples.items()}
+
+
+async def benchmark_api(response, years, horizon, engine, run_index, repeat=1):
+    """
+    Times `weather_forecast_api` end to end for one history length and horizon.
+    The first call of each repeat uses a grid cell no earlier run has touched
+    ('cold'); it is then repeated for the same cell ('warm').
+    """
+    from django.test import AsyncRequestFactory
+
+    from .views import weather_forecast_api
+
+    factory = AsyncRequestFactory()
+    target_date = (datetime.now() - timedelta(days=1) + timedelta(days=horizon)).strftime('%Y-%m-%d')
+    upstreams = ReplayUpstreams(response, years)
+    samples = {'cold': [], 'warm': []}
+
+    with patched_upstreams(upstreams):
+        for attempt in range(repeat):
+            # A fresh cell per cold run: 1 degree apart, so no cache is shared.
+            lat = BENCHMARK_LAT - 20 + run_index * repeat + attempt
+            body = json.dumps({'latitude': lat, 'longitude': BENCHMARK_LON, 'date': target_date,
+                               'engine': engine, 'event_type': BENCHMARK_EVENT})
+            for kind in ('cold', 'warm'):
+                llm_cache.get_cache().clear()
+                request = factory.post('/weather_api/', body, content_type='application/json')
+                started = time.perf_counter()
+                result = await weather_forecast_api(request)
+                samples[kind].append(time.perf_counter() - started)
+                if result.status_code != 200:
+                    raise RuntimeError(f"weather_forecast_api answered {result.status_code}: {result.content[:200]}")
+
+    return {f'weather_forecast_api.{kind}': summarize(values) for kind, values in samples.items()}
+
+
+def environment():
+    """Describes the machine and versions, stored with the results for comparison."""
+    import statsmodels
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': multiprocessing.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'statsmodels': statsmodels.__version__,
+    }
+
+
+def run_api_benchmarks(response, history_years, horizons, engine, repeat):
+    """Runs `benchmark_api` for every combination of history length and horizon."""
+    async def run():
+        results = []
+        for run_index, (years, horizon) in enumerate((y, h) for y in history_years for h in horizons):
+            timings = await benchmark_api(response, years, horizon, engine, run_index, repeat)
+            results.append({'history_years': years, 'horizon_days': horizon, 'engine': engine, 'timings': timings})
+        return results
+    return asyncio.run(run())
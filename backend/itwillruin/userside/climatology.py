@@ -0,0 +1,126 @@
+"""
+Day-of-year climatology tables for each NASA POWER grid cell.
+
+The table has one row per day of the year (1-366). Each row holds the mean and
+the 10th/50th/90th percentiles of every variable, plus the share of rainy days.
+Every statistic is taken over all years within +/- CLIMATOLOGY_WINDOW_DAYS of
+that day. It is built once per cell and saved next to the history store. When new
+days arrive, only the rows whose window contains them are recomputed. Historical
+lookups for a date are then a single row read instead of a scan of the history.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from django.conf import settings
+
+from .data_store import location_key, write_atomically
+
+PERCENTILES = (10, 50, 90)
+STATISTICS = ('mean',) + tuple(f"p{q}" for q in PERCENTILES)
+DAYS_OF_YEAR = np.arange(1, 367)
+
+# Tables already loaded in this process, keyed by location: (built_through, window, table).
+_tables = {}
+
+
+def climatology_path(lat, lon):
+    """Returns the path of the climatology file for a location."""
+    return Path(settings.WEATHER_DATA_DIR) / 'climatology' / f"{location_key(lat, lon)}.nc"
+
+
+def _day_distance(days, day):
+    """Circular distance in days between day-of-year values."""
+    distance = np.abs(days - day)
+    return np.minimum(distance, 366 - distance)
+
+
+def compute_rows(daily_df, days, window):
+    """
+    Computes the climatology rows for the given days of the year.
+
+    Returns:
+        A DataFrame indexed by day of year with (variable, statistic) columns and a
+        ('PRECTOTCORR', 'rain_frequency') column holding the share of rainy days.
+    """
+    values = daily_df.to_numpy(dtype=float)
+    day_of_year = daily_df.index.dayofyear.to_numpy()
+    rain = daily_df['PRECTOTCORR'].to_numpy(dtype=float) if 'PRECTOTCORR' in daily_df else None
+    threshold = settings.RAIN_DAY_THRESHOLD_MM
+
+    columns = pd.MultiIndex.from_product([daily_df.columns, STATISTICS])
+    if rain is not None:
+        columns = columns.append(pd.MultiIndex.from_tuples([('PRECTOTCORR', 'rain_frequency')]))
+    rows = np.full((len(days), len(columns)), np.nan)
+
+    for i, day in enumerate(days):
+        in_window = _day_distance(day_of_year, day) <= window
+        sample = values[in_window]
+        if not len(sample) or np.isnan(sample).all():
+            continue
+        stats = np.vstack([np.nanmean(sample, axis=0), np.nanpercentile(sample, PERCENTILES, axis=0)])
+        rows[i, :stats.size] = stats.T.ravel()
+        if rain is not None:
+            rain_sample = rain[in_window]
+            rain_sample = rain_sample[~np.isnan(rain_sample)]
+            if len(rain_sample):
+                rows[i, -1] = (rain_sample >= threshold).mean()
+
+    return pd.DataFrame(rows, index=pd.Index(days, name='day_of_year'), columns=columns)
+
+
+def _load(lat, lon):
+    path = climatology_path(lat, lon)
+    if not path.exists():
+        return None
+    with xr.open_dataset(path) as ds:
+        flat = ds.to_dataframe()
+        built_through = pd.Timestamp(ds.attrs['built_through'])
+        window = int(ds.attrs['window'])
+    flat.columns = pd.MultiIndex.from_tuples([tuple(column.split('__')) for column in flat.columns])
+    return built_through, window, flat
+
+
+def _save(lat, lon, table, built_through, window):
+    flat = table.copy()
+    flat.columns = ['__'.join(column) for column in table.columns]
+    ds = xr.Dataset.from_dataframe(flat)
+    ds.attrs['built_through'] = built_through.strftime('%Y-%m-%d')
+    ds.attrs['window'] = window
+
+    encoding = {var: {'dtype': 'float32'} for var in ds.data_vars}
+    write_atomically(climatology_path(lat, lon), lambda tmp_path: ds.to_netcdf(tmp_path, encoding=encoding))
+
+
+def get_climatology(lat, lon, daily_df):
+    """
+    Returns the climatology table for a location, bringing it up to date with daily_df.
+
+    The table is built from scratch the first time. After that, only the rows of the
+    days of the year within the smoothing window of newly added days are recomputed.
+    """
+    key = location_key(lat, lon)
+    window = settings.CLIMATOLOGY_WINDOW_DAYS
+    last_date = daily_df.index.max()
+
+    cached = _tables.get(key) or _load(lat, lon)
+    if cached is not None:
+        built_through, cached_window, table = cached
+        if cached_window == window and built_through >= last_date:
+            _tables[key] = cached
+            return table
+
+    if (cached is not None and cached[1] == window
+            and list(cached[2].columns.get_level_values(0).unique()) == list(daily_df.columns)):
+        built_through, _, table = cached
+        new_days = np.unique(daily_df.index[daily_df.index > built_through].dayofyear)
+        affected = DAYS_OF_YEAR[[(_day_distance(new_days, day) <= window).any() for day in DAYS_OF_YEAR]]
+        table = table.copy()
+        table.loc[affected] = compute_rows(daily_df, affected, window).to_numpy()
+    else:
+        table = compute_rows(daily_df, DAYS_OF_YEAR, window)
+
+    _save(lat, lon, table, last_date, window)
+    _tables[key] = (last_date, window, table)
+    return table
@@ -0,0 +1,103 @@
+"""
+On-disk store for NASA POWER daily history.
+
+Every NASA POWER grid cell gets a single NetCDF file holding the raw daily series of each
+parameter as a compressed float32 column, along with the date up to which the
+upstream API has already been queried. `weather_model.fetch_historical_daily_data`
+reads from here and only asks NASA POWER for the days that are still missing.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from django.conf import settings
+
+
+# NASA POWER meteorology comes from the MERRA-2 grid: 0.5 degrees of latitude by
+# 0.625 degrees of longitude. Every point inside a cell gets the same data.
+GRID_LAT_STEP = 0.5
+GRID_LON_STEP = 0.625
+
+
+def snap_to_grid(lat, lon):
+    """Returns the centre of the NASA POWER grid cell containing (lat, lon)."""
+    lat = round(float(lat) / GRID_LAT_STEP) * GRID_LAT_STEP
+    lon = round((float(lon) + 180) / GRID_LON_STEP) * GRID_LON_STEP - 180
+    return min(max(lat, -90.0), 90.0), round(lon, 4)
+
+
+def location_key(lat, lon):
+    """Returns the file-name-safe key used to identify a location in the store."""
+    return f"{float(lat):.4f}_{float(lon):.4f}"
+
+
+def history_path(lat, lon):
+    """Returns the path of the history file for a location."""
+    return Path(settings.WEATHER_DATA_DIR) / 'history' / f"{location_key(lat, lon)}.nc"
+
+
+def load_history(lat, lon):
+    """
+    Loads the stored daily history for a location.
+
+    Returns:
+        A tuple of (DataFrame indexed by date, Timestamp the API was last queried
+        through), or (None, None) if nothing is stored for this location yet.
+    """
+    path = history_path(lat, lon)
+    if not path.exists():
+        return None, None
+
+    with xr.open_dataset(path) as ds:
+        df = ds.to_dataframe()
+        fetched_through = pd.Timestamp(ds.attrs['fetched_through'])
+
+    df.index.name = None
+    return df.astype('float64'), fetched_through
+
+
+def write_atomically(path, write, suffix='.nc.tmp'):
+    """
+    Calls write(tmp_path) on a temporary file next to path, then moves it over path,
+    so concurrent readers never see a partial file. The temporary file is removed if
+    write raises.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=suffix)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def trim_trailing_gaps(df):
+    """
+    Drops trailing days where any parameter is missing. NASA POWER publishes with a
+    lag of a few days, and some parameters later than others, so those days are
+    requested again on the next update instead of being forward-filled for good.
+    Columns without a single value are ignored.
+    """
+    valid = df.dropna(axis=1, how='all').dropna(how='any')
+    if valid.empty:
+        return df
+    return df.loc[:valid.index.max()]
+
+
+def save_history(lat, lon, df, fetched_through):
+    """Writes the daily history for a location, replacing any previous file."""
+    df = trim_trailing_gaps(df)
+    ds = xr.Dataset.from_dataframe(df.rename_axis('date'))
+    ds.attrs['fetched_through'] = pd.Timestamp(fetched_through).strftime('%Y-%m-%d')
+    encoding = {
+        var: {'dtype': 'float32', 'zlib': True, 'complevel': 4, '_FillValue': np.float32(np.nan)}
+        for var in ds.data_vars
+    }
+
+    write_atomically(history_path(lat, lon), lambda tmp_path: ds.to_netcdf(tmp_path, encoding=encoding))
@@ -0,0 +1,172 @@
+"""
+Local stand-ins for NASA POWER, Nominatim and Gemini, used for load testing.
+
+One small HTTP/1.1 server answers all three services under different path prefixes:
+
+    /power/...                        NASA POWER daily point (synthetic history)
+    /nominatim/reverse                Nominatim reverse geocoding
+    /gemini/.../models/M:generateContent  Gemini generateContent (fixed insights)
+
+Each service has its own latency (plus random jitter), error rate (answered with
+a 503, which the clients retry) and extra payload size. Point the app at the
+server with the settings returned by `FakeUpstreams.settings()`, or run it with
+the `fake_upstreams` command.
+"""
+import asyncio
+import json
+import logging
+import random
+import threading
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+
+from .benchmark import STUB_INSIGHTS, synthetic_power_response
+
+logger = logging.getLogger(__name__)
+
+SERVICES = ('power', 'nominatim', 'gemini')
+
+DEFAULT_SERVICE_CONFIG = {
+    'latency': 0.0,
+    'jitter': 0.0,
+    'error_rate': 0.0,
+    'payload_bytes': 0,
+}
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 503: 'Service Unavailable'}
+
+
+class FakeUpstreams:
+    """
+    An asyncio HTTP server that plays NASA POWER, Nominatim and Gemini.
+
+    Args:
+        config: A dict mapping a service name to overrides of DEFAULT_SERVICE_CONFIG.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, config=None, seed=None):
+        self.host = host
+        self.port = port
+        self.config = {service: {**DEFAULT_SERVICE_CONFIG, **(config or {}).get(service, {})}
+                       for service in SERVICES}
+        self.requests = Counter()
+        self.errors = Counter()
+        self._random = random.Random(seed)
+        self._server = None
+
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def settings(self):
+        """Returns the Django settings that send the app's upstream calls here."""
+        return {
+            'POWER_DAILY_POINT_URL': f"{self.base_url()}/power/api/temporal/daily/point",
+            'NOMINATIM_REVERSE_URL': f"{self.base_url()}/nominatim/reverse",
+            'GEMINI_BASE_URL': f"{self.base_url()}/gemini/",
+        }
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # Port 0 picks a free port.
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def start_in_thread(self):
+        """Runs the server on its own event loop in a daemon thread and returns once it listens."""
+        ready = threading.Event()
+
+        async def run():
+            await self.start()
+            ready.set()
+            await self.serve_forever()
+
+        threading.Thread(target=asyncio.run, args=(run(),), daemon=True, name='fake-upstreams').start()
+        ready.wait()
+        return self
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self._respond(method, target, body)
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, target, body):
+        url = urlsplit(target)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path.startswith('/power/'):
+            service = 'power'
+        elif url.path.startswith('/nominatim/'):
+            service = 'nominatim'
+        elif url.path.startswith('/gemini/') and url.path.endswith(':generateContent'):
+            service = 'gemini'
+        else:
+            return 404, {'error': f"No fake service at {url.path}"}
+
+        config = self.config[service]
+        self.requests[service] += 1
+        delay = config['latency'] + self._random.uniform(-config['jitter'], config['jitter'])
+        await asyncio.sleep(max(delay, 0))
+        if self._random.random() < config['error_rate']:
+            self.errors[service] += 1
+            return 503, {'error': f"Injected {service} failure"}
+
+        padding = 'x' * config['payload_bytes']
+        try:
+            if service == 'power':
+                return 200, self._power_response(params, padding)
+            if service == 'nominatim':
+                city = f"Fake City {float(params['lat']):.1f},{float(params['lon']):.1f}"
+                return 200, {'address': {'city': city}, 'padding': padding}
+            text = json.dumps({**STUB_INSIGHTS, 'padding': padding} if padding else STUB_INSIGHTS)
+            return 200, {'candidates': [{
+                'content': {'role': 'model', 'parts': [{'text': text}]},
+                'finishReason': 'STOP',
+                'index': 0,
+            }]}
+        except (KeyError, ValueError) as e:
+            return 400, {'error': f"Bad {service} request: {e}"}
+
+    def _power_response(self, params, padding):
+        seed = int(abs(float(params['latitude'])) * 1000 + abs(float(params['longitude'])) * 10)
+        response = synthetic_power_response(params['start'], params['end'], seed=seed)
+        requested = params.get('parameters', '').split(',')
+        parameter = response['properties']['parameter']
+        response['properties']['parameter'] = {name: values for name, values in parameter.items() if name in requested}
+        response['padding'] = padding
+        return response
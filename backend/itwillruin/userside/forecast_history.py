@@ -0,0 +1,74 @@
+"""
+Completed forecasts stored in the History table and reused as a result cache.
+
+Every finished forecast (weather data plus AI insights) is saved with the NASA
+POWER grid cell it belongs to. A repeat request for the same cell, date, event
+type and engine within FORECAST_RESULT_TTL seconds is answered with one indexed
+query instead of the full fetch, fit and LLM pipeline.
+
+The weather data is the same for every point of a cell, but the insights name the
+place they were written for. They are only reused for the same location name
+(see `reusable_insights`); other places get new insights for the stored forecast.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from .data_store import snap_to_grid
+from .models import History
+
+
+def _engine(engine):
+    return engine or settings.FORECAST_ENGINE
+
+
+async def get_recent_forecast(lat, lon, date_str, event_type=None, engine=None, location_name=None):
+    """
+    Returns the newest fresh History entry for this request, or None. If a location
+    name is given, an entry written for that name is preferred.
+    """
+    cell_lat, cell_lon = snap_to_grid(lat, lon)
+    fresh_after = timezone.now() - timedelta(seconds=settings.FORECAST_RESULT_TTL)
+    entries = History.objects.filter(
+        cell_lat=cell_lat,
+        cell_lon=cell_lon,
+        date=date_str,
+        event=event_type or '',
+        engine=_engine(engine),
+        created_at__gte=fresh_after,
+    ).order_by('-created_at')
+    entry = None
+    if location_name is not None:
+        entry = await entries.filter(location_name=location_name).afirst()
+    if entry is None:
+        entry = await entries.afirst()
+    metrics.cache_result('forecast_result', entry is not None)
+    return entry
+
+
+def reusable_insights(entry, location_name):
+    """Returns the AI insights of an entry if they were written for this location name, else None."""
+    if entry is None or not entry.location_name or entry.location_name != location_name:
+        return None
+    return entry.ai_insights
+
+
+async def save_forecast(lat, lon, date_str, event_type, engine, weather_data, ai_insights, location_name=''):
+    """Stores a completed forecast. Results with failed AI insights are not stored."""
+    if not ai_insights or 'error' in ai_insights:
+        return None
+    cell_lat, cell_lon = snap_to_grid(lat, lon)
+    return await History.objects.acreate(
+        lat=float(lat),
+        lon=float(lon),
+        cell_lat=cell_lat,
+        cell_lon=cell_lon,
+        date=date_str,
+        event=event_type or '',
+        location_name=location_name or '',
+        engine=_engine(engine),
+        forecast_prediction=weather_data,
+        ai_insights=ai_insights,
+    )
@@ -0,0 +1,140 @@
+"""
+Local reverse-geocoding cache used by `utils.get_city_from_latlon`.
+
+Nominatim is slow and strictly rate-limited, and users keep asking about the same
+places. Two local sources are checked before any request goes out:
+
+- An optional offline gazetteer (GEOCODE_GAZETTEER_PATH), a CSV file with
+  `name,lat,lon` columns that is loaded once into an in-memory grid index.
+- Every name resolved through Nominatim, stored in the GeocodeCache table. Any
+  coordinate within GEOCODE_CACHE_RADIUS_KM of a stored point reuses its name.
+  Points without a name are stored as UNKNOWN_CITY and expire after
+  GEOCODE_UNKNOWN_TTL seconds.
+"""
+import csv
+import logging
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import GeocodeCache
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+UNKNOWN_CITY = "Unknown"
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat, lon, radius_km):
+    """Returns (min_lat, max_lat, min_lon, max_lon) enclosing a circle around a point."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+class SpatialIndex:
+    """
+    An in-memory grid index of named points. Points are bucketed into square cells
+    of `cell_degrees`, so a nearest-neighbour query only looks at nearby buckets.
+    """
+
+    def __init__(self, cell_degrees=0.5):
+        self.cell_degrees = cell_degrees
+        self._cells = defaultdict(list)
+
+    def __len__(self):
+        return sum(len(points) for points in self._cells.values())
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, lat, lon, name):
+        self._cells[self._cell(lat, lon)].append((lat, lon, name))
+
+    def nearest(self, lat, lon, radius_km):
+        """Returns the name of the closest point within radius_km, or None."""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        min_cell, max_cell = self._cell(min_lat, min_lon), self._cell(max_lat, max_lon)
+
+        best_name, best_distance = None, radius_km
+        for i in range(min_cell[0], max_cell[0] + 1):
+            for j in range(min_cell[1], max_cell[1] + 1):
+                for point_lat, point_lon, name in self._cells.get((i, j), ()):
+                    distance = haversine_km(lat, lon, point_lat, point_lon)
+                    if distance <= best_distance:
+                        best_name, best_distance = name, distance
+        return best_name
+
+
+_gazetteer = None
+
+
+def load_gazetteer(path):
+    """Loads a `name,lat,lon` CSV file into a SpatialIndex."""
+    index = SpatialIndex()
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                index.add(float(row['lat']), float(row['lon']), row['name'])
+            except (KeyError, TypeError, ValueError):
+                continue
+    logger.info(f"Loaded {len(index)} places from gazetteer {path}")
+    return index
+
+
+def get_gazetteer():
+    """Returns the offline gazetteer index, loading it on first use, or None if not configured."""
+    global _gazetteer
+    path = getattr(settings, 'GEOCODE_GAZETTEER_PATH', None)
+    if _gazetteer is None and path:
+        _gazetteer = load_gazetteer(path)
+    return _gazetteer
+
+
+async def lookup(lat, lon):
+    """Returns a cached place name for a coordinate, or None if it has to be resolved upstream."""
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        name = gazetteer.nearest(lat, lon, settings.GEOCODE_GAZETTEER_RADIUS_KM)
+        if name is not None:
+            return name
+
+    radius_km = settings.GEOCODE_CACHE_RADIUS_KM
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    candidates = GeocodeCache.objects.filter(lat__range=(min_lat, max_lat), lon__range=(min_lon, max_lon)).exclude(
+        _expired_unknown())
+
+    best_name, best_distance = None, radius_km
+    async for entry in candidates:
+        distance = haversine_km(lat, lon, entry.lat, entry.lon)
+        if distance <= best_distance:
+            best_name, best_distance = entry.city, distance
+    return best_name
+
+
+def _expired_unknown():
+    cutoff = timezone.now() - timedelta(seconds=settings.GEOCODE_UNKNOWN_TTL)
+    return Q(city=UNKNOWN_CITY, created_at__lt=cutoff)
+
+
+async def store(lat, lon, city):
+    """Remembers the place name resolved for a coordinate, dropping expired unknown entries around it."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, settings.GEOCODE_CACHE_RADIUS_KM)
+    await GeocodeCache.objects.filter(
+        _expired_unknown(), lat__range=(min_lat, max_lat), lon__range=(min_lon, max_lon)).adelete()
+    await GeocodeCache.objects.acreate(lat=lat, lon=lon, city=city)
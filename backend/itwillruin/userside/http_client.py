@@ -0,0 +1,118 @@
+"""
+Shared async HTTP client for the upstream services (NASA POWER, Nominatim).
+
+All outgoing requests go through one keep-alive connection pool per event loop,
+so repeated calls to the same host reuse their TLS connection instead of opening
+a new one. Every request has explicit timeouts, the number of concurrent requests
+per host is capped, and transient failures are retried with exponential backoff.
+A pool is closed when its event loop shuts down, or explicitly with `close()`.
+"""
+import asyncio
+import logging
+import random
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limiting and temporary server-side failures.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# httpx clients and semaphores are bound to the event loop they were created on.
+_pools = weakref.WeakKeyDictionary()
+
+
+class _Pool:
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+            ),
+            headers={'User-Agent': settings.HTTP_USER_AGENT},
+        )
+        self.host_limits = {}
+
+    def host_limit(self, host):
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(settings.HTTP_MAX_CONNECTIONS_PER_HOST)
+        return self.host_limits[host]
+
+
+async def _close_on_shutdown(pool):
+    # Left suspended at the yield. asyncio.run and asgiref finalise open async
+    # generators (loop.shutdown_asyncgens) before closing a loop, which runs the
+    # finally block and closes the pool's connections.
+    try:
+        yield
+    finally:
+        await pool.client.aclose()
+
+
+async def _get_pool():
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = _Pool()
+        pool.closer = _close_on_shutdown(pool)
+        await pool.closer.asend(None)
+    return pool
+
+
+async def get_client():
+    """Returns the shared httpx.AsyncClient for the running event loop."""
+    return (await _get_pool()).client
+
+
+async def close():
+    """Closes the running event loop's pool, if it has one."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.closer.aclose()
+
+
+def _retry_delay(attempt, response=None):
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        delay = float(retry_after)
+    else:
+        delay = settings.HTTP_RETRY_BACKOFF * (2 ** attempt) * (1 + random.random() / 2)
+    return min(delay, settings.HTTP_MAX_RETRY_DELAY)
+
+
+async def get_json(url, params=None, headers=None):
+    """
+    Sends a GET request and returns the decoded JSON body.
+
+    Timeouts, connection errors and retryable status codes are retried up to
+    HTTP_RETRIES times with exponential backoff.
+
+    Raises:
+        httpx.HTTPError: If the request still fails after all retries.
+    """
+    pool = await _get_pool()
+    host = urlsplit(url).netloc
+    attempts = settings.HTTP_RETRIES + 1
+
+    for attempt in range(attempts):
+        response = None
+        try:
+            async with pool.host_limit(host):
+                response = await pool.client.get(url, params=params, headers=headers)
+            if response.status_code not in RETRY_STATUS_CODES:
+                response.raise_for_status()
+                return response.json()
+            error = httpx.HTTPStatusError(
+                f"{response.status_code} from {host}", request=response.request, response=response)
+        except httpx.TransportError as e:
+            error = e
+
+        if attempt == attempts - 1:
+            raise error
+        delay = _retry_delay(attempt, response)
+        logger.warning(f"Request to {host} failed ({error!r}), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
@@ -0,0 +1,138 @@
+"""
+GPM IMERG daily precipitation for NASA POWER grid cells, read from local files.
+
+IMERG daily files (3B-DAY...nc4) hold a global 0.1 degree precipitation grid, far
+finer than the MERRA-2 grid NASA POWER uses for rain. A directory of these files
+(IMERG_DATA_DIR) is scanned one file at a time. Each file is opened lazily and only
+the pixels inside the requested cell are read, so no global grid is ever loaded
+into memory. The result is the cell's mean daily precipitation, stored as a
+compact float32 series under WEATHER_DATA_DIR/imerg. Later runs only read files
+newer than the cached series.
+
+Extraction is run ahead of time by the `ingest_imerg` command. Requests only read
+the cached series (see `load_cell_series`).
+"""
+import logging
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from django.conf import settings
+
+from .data_store import GRID_LAT_STEP, GRID_LON_STEP, location_key, snap_to_grid, write_atomically
+
+logger = logging.getLogger(__name__)
+
+# Precipitation variable names in IMERG V07 and V06 files.
+PRECIPITATION_VARIABLES = ('precipitation', 'precipitationCal')
+
+# Daily file names carry the date, e.g. 3B-DAY.MS.MRG.3IMERG.19980101-S000000-E235959.V07B.nc4
+FILE_DATE_PATTERN = re.compile(r'\.(\d{8})-S\d{6}')
+
+
+def series_path(lat, lon):
+    """Returns the path of the cached IMERG series for a location."""
+    return Path(settings.WEATHER_DATA_DIR) / 'imerg' / f"{location_key(lat, lon)}.nc"
+
+
+def list_files(directory):
+    """
+    Lists the IMERG daily files under a directory, searched recursively.
+
+    Returns:
+        A list of (date, path) tuples sorted by date.
+    """
+    files = []
+    for path in Path(directory).rglob('*.nc4'):
+        match = FILE_DATE_PATTERN.search(path.name)
+        if match:
+            files.append((pd.Timestamp(match.group(1)), path))
+    return sorted(files)
+
+
+def read_cell(path, lat, lon):
+    """
+    Returns the mean daily precipitation (mm) over the grid cell centred on
+    (lat, lon) in one IMERG daily file, or NaN if the file has no valid pixels there.
+    """
+    with xr.open_dataset(path) as ds:
+        variable = next((name for name in PRECIPITATION_VARIABLES if name in ds), None)
+        if variable is None:
+            raise ValueError(f"{path} has no IMERG precipitation variable")
+        cell = ds[variable].sel(
+            lat=slice(lat - GRID_LAT_STEP / 2, lat + GRID_LAT_STEP / 2),
+            lon=slice(lon - GRID_LON_STEP / 2, lon + GRID_LON_STEP / 2),
+        )
+        values = cell.values
+    if not values.size or np.isnan(values).all():
+        return np.nan
+    return float(np.nanmean(values))
+
+
+def load_cell_series(lat, lon):
+    """Returns the cached IMERG series for the grid cell containing (lat, lon), or None."""
+    lat, lon = snap_to_grid(lat, lon)
+    path = series_path(lat, lon)
+    if not path.exists():
+        return None
+    with xr.open_dataset(path) as ds:
+        series = ds['precipitation'].to_series().astype('float64')
+    series.index.name = None
+    return series
+
+
+def save_cell_series(lat, lon, series):
+    """Writes the IMERG series of a location, replacing any previous file."""
+    ds = xr.Dataset({'precipitation': ('date', series.to_numpy(dtype='float32'))}, coords={'date': series.index})
+    encoding = {'precipitation': {'dtype': 'float32', 'zlib': True, 'complevel': 4, '_FillValue': np.float32(np.nan)}}
+
+    write_atomically(series_path(lat, lon), lambda tmp_path: ds.to_netcdf(tmp_path, encoding=encoding))
+
+
+def update_cell_series(lat, lon, files=None):
+    """
+    Extracts the IMERG series of the grid cell containing (lat, lon) from the files in
+    IMERG_DATA_DIR, reading only files dated after the cached series.
+
+    Returns:
+        A tuple of (series, number of files read).
+    """
+    lat, lon = snap_to_grid(lat, lon)
+    if files is None:
+        files = list_files(settings.IMERG_DATA_DIR)
+
+    cached = load_cell_series(lat, lon)
+    if cached is not None and not cached.empty:
+        files = [(date, path) for date, path in files if date > cached.index.max()]
+
+    values = {}
+    for date, path in files:
+        try:
+            values[date] = read_cell(path, lat, lon)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping IMERG file {path}: {e}")
+
+    series = pd.Series(values, dtype='float64')
+    if cached is not None:
+        series = pd.concat([cached, series]).sort_index()
+    if values:
+        save_cell_series(lat, lon, series)
+    return series, len(values)
+
+
+def rain_day_frequency(series, target_date, window=None):
+    """
+    Returns the share of days within +/- window days of target_date's day of year
+    (in every year of the series) with at least RAIN_DAY_THRESHOLD_MM of rain, or
+    None if the series has no data for that part of the year.
+    """
+    window = settings.CLIMATOLOGY_WINDOW_DAYS if window is None else window
+    series = series.dropna()
+    distance = np.abs(series.index.dayofyear.to_numpy() - target_date.dayofyear)
+    distance = np.minimum(distance, 366 - distance)
+    sample = series.to_numpy()[distance <= window]
+    if not len(sample):
+        return None
+    return float((sample >= settings.RAIN_DAY_THRESHOLD_MM).mean())
@@ -0,0 +1,114 @@
+"""
+In-process result cache for the Gemini helpers in `utils`.
+
+Model answers for 24.0°C and 24.3°C with the same sky, place and event are
+interchangeable, so results are cached under a key built from bucketed inputs:
+every numeric argument is rounded to a step chosen from its name (temperature to
+the nearest degree, rain chance to the nearest 10%, ...) and strings are
+normalised. The cache is bounded (LRU eviction) and entries expire after a TTL.
+"""
+import functools
+import inspect
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+
+# (name fragment, step) pairs; the first fragment found in an argument or dict key name wins.
+QUANTIZATION_STEPS = (
+    ('rain', 10),
+    ('precip', 1),
+    ('humi', 5),
+    ('wind', 5),
+    ('temp', 1),
+    ('feels_like', 1),
+    ('uv', 1),
+)
+DEFAULT_STEP = 1
+
+
+def step_for(name):
+    """Returns the bucket size used for a numeric input with the given name."""
+    name = name.lower()
+    for fragment, step in QUANTIZATION_STEPS:
+        if fragment in name:
+            return step
+    return DEFAULT_STEP
+
+
+def quantize(name, value):
+    """Turns an input value into a hashable, bucketed cache-key component."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, quantize(key, item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(quantize(name, item) for item in value)
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        step = step_for(name)
+        return round(value / step) * step
+    return str(value).strip().lower()
+
+
+class QuantizedCache:
+    """A thread-safe TTL + LRU cache shared by the wrapped functions."""
+
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_cache = None
+
+
+def get_cache():
+    """Returns the process-wide LLM result cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = QuantizedCache(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL)
+    return _cache
+
+
+def cached_by_quantized_inputs(func):
+    """
+    Caches a function's results under its bucketed arguments. Results that are
+    None or error dictionaries are not cached, and exceptions are never cached.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__,) + tuple(quantize(name, value) for name, value in bound.arguments.items())
+
+        cache = get_cache()
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+        result = func(*args, **kwargs)
+        if result is not None and not (isinstance(result, dict) and 'error' in result):
+            cache.set(key, result)
+        return result
+
+    return wrapper
@@ -0,0 +1,206 @@
+"""
+Concurrency load test of the forecast endpoints, run by the `loadtest` command.
+
+Requests to /weather_api/ and /dashboard/ are sent at a fixed rate (open loop:
+a slow response does not hold back the next request), spread over a set of
+grid cells and dates. By default the ASGI application runs in this process,
+behind httpx's ASGI transport, with its upstream calls sent to the local
+stand-ins of `fake_upstreams`. Latency there therefore includes all the
+application's own queueing, and an event-loop lag monitor shows when blocking
+work stalls the loop. With `url`, an already running server is tested instead
+and only client-side numbers are meaningful.
+
+The report gives throughput, latency percentiles, status counts, the mean of
+each Server-Timing stage and the event-loop lag.
+"""
+import asyncio
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+
+LOADTEST_EVENT = '__loadtest__'
+TARGETS = ('weather_api', 'dashboard')
+
+# Cells are spread around this point, one grid step apart.
+ORIGIN_LAT = 30.0
+ORIGIN_LON = 31.25
+
+SERVER_TIMING_PATTERN = re.compile(r'([^,;\s]+);dur=([0-9.]+)')
+
+
+def load_locations(count, seed=0):
+    """Returns `count` distinct (lat, lon) points, each in its own NASA POWER grid cell."""
+    side = int(np.ceil(np.sqrt(count)))
+    cells = [(ORIGIN_LAT + 0.5 * (i // side), ORIGIN_LON + 0.625 * (i % side)) for i in range(count)]
+    random.Random(seed).shuffle(cells)
+    return cells
+
+
+def percentiles(samples):
+    """Reduces latency samples (seconds) to milliseconds at the usual percentiles."""
+    if not samples:
+        return None
+    values = np.asarray(samples) * 1000
+    return {
+        'count': len(values),
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p90_ms': round(float(np.percentile(values, 90)), 2),
+        'p99_ms': round(float(np.percentile(values, 99)), 2),
+        'max_ms': round(float(values.max()), 2),
+    }
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes a task that sleeps for `interval`
+    seconds. A loop kept busy by blocking calls shows up as large lag.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.perf_counter() - started - self.interval, 0.0))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class LoadTest:
+    """
+    Sends forecast requests at `rate` per second for `duration` seconds.
+
+    Args:
+        client: An httpx.AsyncClient pointed at the application.
+        targets: A dict mapping target names (see TARGETS) to their share of the requests.
+    """
+
+    def __init__(self, client, targets, rate, duration, locations, engine=None, horizon_days=14, seed=0):
+        self.client = client
+        self.targets = targets
+        self.rate = rate
+        self.duration = duration
+        self.locations = locations
+        self.engine = engine
+        self.horizon_days = horizon_days
+        self._random = random.Random(seed)
+        self._csrf_token = None
+        self.latencies = {target: [] for target in targets}
+        self.statuses = {target: Counter() for target in targets}
+        self.stages = {}
+
+    async def _prepare(self):
+        # Both endpoints are CSRF protected: take the token cookie from a page, as a browser would.
+        response = await self.client.get('/map/')
+        response.raise_for_status()
+        self._csrf_token = self.client.cookies.get('csrftoken')
+
+    def _request_args(self, target):
+        lat, lon = self._random.choice(self.locations)
+        date = (datetime.now() + timedelta(days=self._random.randint(1, self.horizon_days))).strftime('%Y-%m-%d')
+        headers = {'X-CSRFToken': self._csrf_token}
+        if target == 'weather_api':
+            body = {'latitude': lat, 'longitude': lon, 'date': date, 'event_type': LOADTEST_EVENT}
+            if self.engine:
+                body['engine'] = self.engine
+            return {'url': '/weather_api/', 'json': body, 'headers': headers}
+        form = {'lat': lat, 'lon': lon, 'date': date, 'event_type': LOADTEST_EVENT, 'engine': self.engine or ''}
+        return {'url': '/dashboard/', 'data': form, 'headers': headers}
+
+    async def _send(self, target):
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(**self._request_args(target))
+        except httpx.HTTPError as e:
+            self.statuses[target][type(e).__name__] += 1
+            return
+        self.latencies[target].append(time.perf_counter() - started)
+        self.statuses[target][str(response.status_code)] += 1
+        for name, duration in SERVER_TIMING_PATTERN.findall(response.headers.get('server-timing', '')):
+            self.stages.setdefault(name, []).append(float(duration))
+
+    async def run(self):
+        """Runs the load test and returns its report."""
+        await self._prepare()
+        monitor = LoopLagMonitor()
+        monitor.start()
+        names, weights = zip(*self.targets.items())
+        tasks = []
+        started = time.perf_counter()
+        for i in range(int(self.rate * self.duration)):
+            # Open loop: request i is sent at i / rate seconds, however the earlier ones fare.
+            delay = started + i / self.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._send(self._random.choices(names, weights)[0])))
+        sent_in = time.perf_counter() - started
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+
+        completed = sum(len(samples) for samples in self.latencies.values())
+        return {
+            'requests': len(tasks),
+            'completed': completed,
+            'elapsed_s': round(elapsed, 3),
+            'offered_rps': self.rate,
+            # Below the offered rate when the client itself could not keep up.
+            'sent_rps': round(len(tasks) / sent_in, 2) if sent_in else None,
+            'throughput_rps': round(completed / elapsed, 2),
+            'targets': {
+                target: {'latency': percentiles(self.latencies[target]), 'statuses': dict(self.statuses[target])}
+                for target in self.targets
+            },
+            'server_timing_mean_ms': {name: round(float(np.mean(values)), 2)
+                                      for name, values in sorted(self.stages.items())},
+            'event_loop_lag': percentiles(monitor.samples),
+        }
+
+
+def asgi_client():
+    """Returns an httpx client that calls the Django ASGI application in this process."""
+    from django.core.asgi import get_asgi_application
+
+    transport = httpx.ASGITransport(app=get_asgi_application())
+    return httpx.AsyncClient(transport=transport, base_url='http://localhost', timeout=None)
+
+
+def use_upstreams(upstream_settings):
+    """Points the application's upstream URLs at other servers, e.g. the fake upstreams."""
+    import os
+
+    from django.conf import settings
+
+    from . import utils
+
+    for name, value in upstream_settings.items():
+        setattr(settings, name, value)
+    # The Gemini client reads its base URL and key when it is created.
+    os.environ.setdefault('GEMINI_API_KEY', 'loadtest')
+    utils._client = None
+
+
+def run(targets, rate, duration, locations, url=None, engine=None, seed=0):
+    """Runs a load test against `url`, or in process if it is None, and returns its report."""
+    async def main():
+        client = httpx.AsyncClient(base_url=url, timeout=None) if url else asgi_client()
+        async with client:
+            return await LoadTest(client, targets, rate, duration, locations, engine=engine, seed=seed).run()
+    return asyncio.run(main())
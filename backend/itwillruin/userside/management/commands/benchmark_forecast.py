@@ -0,0 +1,95 @@
+"""
+Benchmarks the forecast pipeline offline and writes the timings as JSON.
+
+NASA POWER is replayed from a recorded response and Gemini is stubbed (see
+`userside.benchmark`). Every stage of the forecast is timed on its own, and the
+forecast API end to end, for each history length and horizon:
+
+    python manage.py benchmark_forecast --history-years 1 3 6 --horizons 1 7 30 --output results.json
+
+The bundled Cairo fixture is replayed by default. Record one from the live API
+with --record, and replay it later with --fixture.
+"""
+import asyncio
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from userside import benchmark
+from userside.models import GeocodeCache, History
+from userside.weather_model import FORECAST_ENGINES
+
+
+class Command(BaseCommand):
+    help = "Times each forecast stage and the forecast API offline, against a recorded NASA POWER response."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixture', default=None,
+                            help="NASA POWER response to replay (defaults to the bundled Cairo fixture), "
+                                 "or where --record saves it (defaults to WEATHER_DATA_DIR/benchmarks).")
+        parser.add_argument('--record', action='store_true',
+                            help="Download a fresh fixture from the live NASA POWER API first.")
+        parser.add_argument('--history-years', type=int, nargs='+', default=[1, 3, 6],
+                            help="History lengths to benchmark, in years.")
+        parser.add_argument('--horizons', type=int, nargs='+', default=[1, 7, 30],
+                            help="Forecast horizons to benchmark, in days.")
+        parser.add_argument('--engine', choices=FORECAST_ENGINES, default='sarimax',
+                            help="Forecast engine used for the end-to-end API runs.")
+        parser.add_argument('--repeat', type=int, default=1, help="Number of runs per measurement.")
+        parser.add_argument('--skip-api', action='store_true', help="Only benchmark the individual stages.")
+        parser.add_argument('--output', default=None,
+                            help="Results file (defaults to WEATHER_DATA_DIR/benchmarks/results-<time>.json).")
+
+    def handle(self, *args, **options):
+        if options['record']:
+            fixture_path = Path(options['fixture'] or benchmark.benchmarks_dir() / 'power_daily_fixture.json')
+            self.stdout.write(f"Recording fixture to {fixture_path}...")
+            response = asyncio.run(benchmark.record_fixture(fixture_path, years=max(options['history_years'])))
+        else:
+            fixture_path = Path(options['fixture'] or benchmark.BUNDLED_FIXTURE_PATH)
+            response = benchmark.load_fixture(fixture_path)
+
+        results = {
+            'started_at': datetime.now().isoformat(),
+            'fixture': {'path': str(fixture_path), 'source': benchmark.fixture_source(response)},
+            'environment': benchmark.environment(),
+            'options': {key: options[key] for key in ('history_years', 'horizons', 'engine', 'repeat')},
+            'stages': [],
+            'api': [],
+        }
+
+        with tempfile.TemporaryDirectory(prefix='benchmark-') as data_dir:
+            with benchmark.isolated_data_dir(data_dir):
+                for years in options['history_years']:
+                    for horizon in options['horizons']:
+                        self.stdout.write(f"Stages: {years} years of history, {horizon} days ahead...")
+                        timings = benchmark.benchmark_stages(response, years, horizon, options['repeat'])
+                        results['stages'].append({'history_years': years, 'horizon_days': horizon, 'timings': timings})
+                        self.write_timings(timings)
+
+                if not options['skip_api']:
+                    self.stdout.write(f"API end to end ({options['engine']})...")
+                    try:
+                        results['api'] = benchmark.run_api_benchmarks(
+                            response, options['history_years'], options['horizons'],
+                            options['engine'], options['repeat'])
+                    finally:
+                        # Leave no benchmark entries behind in the shared tables.
+                        History.objects.filter(event=benchmark.BENCHMARK_EVENT).delete()
+                        GeocodeCache.objects.filter(city=benchmark.BENCHMARK_CITY).delete()
+                    for run in results['api']:
+                        self.stdout.write(f"  {run['history_years']} years, {run['horizon_days']} days ahead:")
+                        self.write_timings(run['timings'])
+
+        output = Path(options['output'] or benchmark.benchmarks_dir() / f"results-{datetime.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}."))
+
+    def write_timings(self, timings):
+        for stage, summary in timings.items():
+            self.stdout.write(f"    {stage:<32} {summary['median_s'] * 1000:10.1f} ms")
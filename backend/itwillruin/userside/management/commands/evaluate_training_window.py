@@ -0,0 +1,71 @@
+"""
+Backtests SARIMAX training windows for a location and reports accuracy and fit time:
+
+    python manage.py evaluate_training_window --lat 30.0444 --lon 31.2357 --windows all auto 365 730
+
+Each window is scored with and without the seasonal terms at several cutoff dates
+(see `userside.backtest`), using the location's stored history.
+"""
+import asyncio
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from userside import backtest, weather_model
+
+
+def parse_window(value):
+    if value in ('auto', 'all'):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise CommandError(f"Invalid window '{value}': use a number of days, 'auto' or 'all'.")
+
+
+class Command(BaseCommand):
+    help = "Reports forecast MAE and fit time for each SARIMAX training window choice."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lat', type=float, required=True)
+        parser.add_argument('--lon', type=float, required=True)
+        parser.add_argument('--windows', nargs='+', default=['all', 'auto', '365', '730'],
+                            help="Training windows: days, 'auto' or 'all'.")
+        parser.add_argument('--seasonal', nargs='+', choices=('none', 'deseasonalize'),
+                            default=['none', 'deseasonalize'], help="Seasonal terms to compare.")
+        parser.add_argument('--horizons', type=int, nargs='+', default=[1, 7, 14],
+                            help="Forecast horizons to score, in days.")
+        parser.add_argument('--origins', type=int, default=6, help="Number of backtest cutoff dates.")
+        parser.add_argument('--spacing', type=int, default=30, help="Days between cutoff dates.")
+        parser.add_argument('--variables', nargs='+', choices=weather_model.FORECAST_VARIABLES,
+                            default=weather_model.FORECAST_VARIABLES)
+        parser.add_argument('--output', default=None, help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        windows = [parse_window(value) for value in options['windows']]
+        seasonal_options = [None if value == 'none' else value for value in options['seasonal']]
+
+        historical_df = asyncio.run(weather_model.fetch_historical_daily_data(options['lat'], options['lon']))
+        self.stdout.write(f"History: {historical_df.index.min():%Y-%m-%d} to {historical_df.index.max():%Y-%m-%d} "
+                          f"({len(historical_df)} days). Backtesting {options['origins']} cutoffs...")
+
+        results = backtest.evaluate_in_pool(
+            historical_df, windows, seasonal_options, options['horizons'],
+            origins=options['origins'], spacing_days=options['spacing'], variables=options['variables'])
+
+        horizons = ''.join(f"{'MAE d+' + str(h):>12}" for h in options['horizons'])
+        self.stdout.write(f"{'variable':<16}{'window':>8}{'days':>7}{'seasonal':>15}{horizons}{'fit s':>9}")
+        for result in results:
+            maes = ''.join(f"{result['mae'][str(h)]:>12.3f}" for h in options['horizons'])
+            self.stdout.write(f"{result['variable']:<16}{result['window']!s:>8}{result['training_days'] or '-'!s:>7}"
+                              f"{result['seasonal_terms'] or 'none':>15}{maes}{result['fit_seconds_mean']:>9.2f}")
+
+        if options['output']:
+            output = Path(options['output'])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with open(output, 'w') as f:
+                json.dump({'options': {key: options[key] for key in ('lat', 'lon', 'windows', 'seasonal', 'horizons',
+                                                                     'origins', 'spacing', 'variables')},
+                           'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {output}."))
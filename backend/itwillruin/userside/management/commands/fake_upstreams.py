@@ -0,0 +1,69 @@
+"""
+Serves local stand-ins for NASA POWER, Nominatim and Gemini (see `userside.fake_upstreams`):
+
+    python manage.py fake_upstreams --port 8765 --latency 0.2 --error-rate 0.05
+
+Every option applies to all three services; the --power-*, --nominatim-* and
+--gemini-* variants override it for one. Start the application with the printed
+settings to send its upstream calls here.
+"""
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from userside.fake_upstreams import DEFAULT_SERVICE_CONFIG, SERVICES, FakeUpstreams
+
+OPTION_TYPES = {'latency': float, 'jitter': float, 'error_rate': float, 'payload_bytes': int}
+OPTION_HELP = {
+    'latency': "Delay before each response, in seconds.",
+    'jitter': "Random variation of the delay, +/- seconds.",
+    'error_rate': "Share of requests answered with a 503.",
+    'payload_bytes': "Padding added to each response, in bytes.",
+}
+
+
+def add_service_arguments(parser):
+    """Adds the latency/error/payload options for all services and for each one."""
+    for option, option_type in OPTION_TYPES.items():
+        flag = option.replace('_', '-')
+        parser.add_argument(f'--{flag}', type=option_type, default=DEFAULT_SERVICE_CONFIG[option],
+                            help=OPTION_HELP[option])
+        for service in SERVICES:
+            parser.add_argument(f'--{service}-{flag}', type=option_type, default=None,
+                                help=f"{OPTION_HELP[option]} For {service} only.")
+
+
+def service_config(options):
+    """Builds the FakeUpstreams config from the parsed service options."""
+    config = {}
+    for service in SERVICES:
+        config[service] = {}
+        for option in OPTION_TYPES:
+            value = options[f'{service}_{option}']
+            config[service][option] = options[option] if value is None else value
+    return config
+
+
+class Command(BaseCommand):
+    help = "Serves fake NASA POWER, Nominatim and Gemini APIs with configurable latency and errors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--seed', type=int, default=None, help="Seed for the latency jitter and errors.")
+        add_service_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = FakeUpstreams(options['host'], options['port'], service_config(options), seed=options['seed'])
+
+        async def serve():
+            await server.start()
+            self.stdout.write(f"Fake upstreams listening on {server.base_url()}. Settings to use:")
+            for name, value in server.settings().items():
+                self.stdout.write(f"    {name} = '{value}'")
+            await server.serve_forever()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            self.stdout.write(f"Requests served: {dict(server.requests)}; injected errors: {dict(server.errors)}")
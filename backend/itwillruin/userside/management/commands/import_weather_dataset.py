@@ -0,0 +1,40 @@
+"""
+Converts a bundled daily weather dataset into a pre-seeded history for its location.
+
+The dataset is parsed once and stored as memory-mapped column files (see
+`userside.seed_store`), so forecasts for that grid cell start from it without
+downloading the history from NASA POWER:
+
+    python manage.py import_weather_dataset ../../Data/cairo_weather.xlsx --lat 30.0444 --lon 31.2357
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from userside import seed_store
+
+
+class Command(BaseCommand):
+    help = "Imports a daily weather spreadsheet (.xlsx or .csv) as the seed history of a location."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Dataset with a date column and one column per NASA POWER parameter.")
+        parser.add_argument('--lat', type=float, required=True, help="Latitude the dataset was taken at.")
+        parser.add_argument('--lon', type=float, required=True, help="Longitude the dataset was taken at.")
+        parser.add_argument('--date-column', default='Date', help="Name of the date column.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            df = seed_store.read_dataset(options['path'], options['date_column'])
+        except (OSError, KeyError, ValueError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+        if df.empty:
+            raise CommandError(f"{options['path']} has no rows.")
+
+        path = seed_store.write_seed(options['lat'], options['lon'], df, options['path'])
+        self.stdout.write(
+            f"Read {len(df)} days ({df.index.min():%Y-%m-%d} to {df.index.max():%Y-%m-%d}) "
+            f"with columns {', '.join(df.columns)}."
+        )
+        self.stdout.write(self.style.SUCCESS(f"Seed written to {path} in {time.monotonic() - started:.1f}s."))
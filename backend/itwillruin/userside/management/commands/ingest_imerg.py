@@ -0,0 +1,47 @@
+"""
+Extracts GPM IMERG daily precipitation series for grid cells from local files.
+
+Reads the IMERG daily files in IMERG_DATA_DIR (or --data-dir) one at a time and
+caches each cell's series (see `userside.imerg`). The forecast then uses the
+cached series for the rain chance. Re-running the command only reads files newer
+than each cell's cached series:
+
+    python manage.py ingest_imerg --location 30.0444 31.2357 --location 31.2001 29.9187
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from userside import imerg
+from userside.data_store import snap_to_grid
+
+
+class Command(BaseCommand):
+    help = "Caches GPM IMERG daily precipitation series for grid cells from local .nc4 files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', type=float, nargs=2, action='append', metavar=('LAT', 'LON'),
+                            help="Location to extract (repeatable). Defaults to FORECAST_WARM_LOCATIONS.")
+        parser.add_argument('--data-dir', default=None,
+                            help="Directory of IMERG daily files (defaults to IMERG_DATA_DIR).")
+
+    def handle(self, *args, **options):
+        data_dir = options['data_dir'] or settings.IMERG_DATA_DIR
+        if not data_dir:
+            raise CommandError("Set IMERG_DATA_DIR or pass --data-dir.")
+        locations = options['location'] or settings.FORECAST_WARM_LOCATIONS
+        if not locations:
+            raise CommandError("No locations given and FORECAST_WARM_LOCATIONS is empty.")
+
+        files = imerg.list_files(data_dir)
+        self.stdout.write(f"Found {len(files)} IMERG daily files in {data_dir}.")
+        cells = list(dict.fromkeys(snap_to_grid(lat, lon) for lat, lon in locations))
+        for lat, lon in cells:
+            started = time.monotonic()
+            series, read = imerg.update_cell_series(lat, lon, files)
+            self.stdout.write(
+                f"  {lat}, {lon}: read {read} new files, {series.notna().sum()} days cached "
+                f"({time.monotonic() - started:.1f}s)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Done, {len(cells)} cells."))
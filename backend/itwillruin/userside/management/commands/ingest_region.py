@@ -0,0 +1,48 @@
+"""
+Downloads the NASA POWER history of a whole bounding box into a region cube.
+
+Every grid cell in the box is fetched once and stored in a single NetCDF cube (see
+`userside.region_store`). Forecasts for any point inside the box are then read
+from the cube instead of calling NASA POWER. Re-running the command, e.g. daily
+from cron, only downloads the days added since the last run:
+
+    python manage.py ingest_region cairo --bbox 29.5 30.5 31.0 32.5
+"""
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from userside.region_store import grid_points, region_path
+from userside.weather_model import ingest_region
+
+
+class Command(BaseCommand):
+    help = "Ingests the NASA POWER daily history of every grid cell inside a bounding box."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help="Region name, used as the file name of the cube.")
+        parser.add_argument('--bbox', type=float, nargs=4, required=True,
+                            metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                            help="Bounding box of the region in degrees.")
+        parser.add_argument('--start', default="20200101",
+                            help="First day (YYYYMMDD) to download when the cube is created.")
+
+    def handle(self, *args, **options):
+        min_lat, min_lon, max_lat, max_lon = options['bbox']
+        if min_lat > max_lat or min_lon > max_lon:
+            raise CommandError("The bounding box must be given as MIN_LAT MIN_LON MAX_LAT MAX_LON.")
+
+        lats, lons = grid_points(min_lat, min_lon, max_lat, max_lon)
+        self.stdout.write(f"Ingesting {len(lats) * len(lons)} grid cells into region '{options['name']}'...")
+        started = time.monotonic()
+        cells, failed = asyncio.run(
+            ingest_region(options['name'], min_lat, min_lon, max_lat, max_lon, options['start'])
+        )
+
+        for lat, lon in failed:
+            self.stderr.write(f"  {lat}, {lon}: failed")
+        self.stdout.write(self.style.SUCCESS(
+            f"{cells - len(failed)}/{cells} cells stored in {region_path(options['name'])} "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,100 @@
+"""
+Load tests the forecast endpoints at a fixed request rate (see `userside.loadtest`):
+
+    python manage.py loadtest --rate 20 --duration 30 --target weather_api=3 dashboard=1 --latency 0.3
+
+By default the application runs in this process against the fake upstreams, with
+an empty temporary data directory, so every grid cell starts cold. The fake
+upstream options are those of the `fake_upstreams` command. With --url, a
+running server is tested instead; it must be started against its own upstreams.
+"""
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from userside import benchmark, loadtest
+from userside.fake_upstreams import FakeUpstreams
+from userside.management.commands.fake_upstreams import add_service_arguments, service_config
+from userside.models import GeocodeCache, History
+from userside.weather_model import FORECAST_ENGINES
+
+
+def parse_targets(values):
+    """Parses 'name' or 'name=weight' target arguments into a dict of weights."""
+    targets = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in loadtest.TARGETS:
+            raise CommandError(f"Unknown target '{name}'; choose from {', '.join(loadtest.TARGETS)}.")
+        try:
+            targets[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise CommandError(f"Invalid weight in '{value}'.")
+    return targets
+
+
+class Command(BaseCommand):
+    help = "Sends forecast requests at a fixed rate and reports throughput, latency and event-loop lag."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=5.0, help="Requests per second.")
+        parser.add_argument('--duration', type=float, default=30.0, help="Seconds to send requests for.")
+        parser.add_argument('--target', nargs='+', default=['weather_api'],
+                            help="Endpoints to load, as name or name=weight (weather_api, dashboard).")
+        parser.add_argument('--locations', type=int, default=20, help="Number of distinct grid cells to request.")
+        parser.add_argument('--engine', choices=FORECAST_ENGINES, default=None)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--url', default=None,
+                            help="Test a running server at this base URL instead of the in-process application.")
+        parser.add_argument('--output', default=None, help="Also write the report to this JSON file.")
+        add_service_arguments(parser)
+
+    def handle(self, *args, **options):
+        targets = parse_targets(options['target'])
+        locations = loadtest.load_locations(options['locations'], options['seed'])
+        run_options = {key: options[key] for key in ('rate', 'duration', 'locations', 'engine', 'url')}
+
+        if options['url']:
+            self.stdout.write(f"Load testing {options['url']}...")
+            report = loadtest.run(targets, options['rate'], options['duration'], locations,
+                                  url=options['url'], engine=options['engine'], seed=options['seed'])
+        else:
+            upstreams = FakeUpstreams(port=0, config=service_config(options), seed=options['seed']).start_in_thread()
+            loadtest.use_upstreams(upstreams.settings())
+            self.stdout.write(f"Load testing in process, fake upstreams on {upstreams.base_url()}...")
+            try:
+                with tempfile.TemporaryDirectory(prefix='loadtest-') as data_dir:
+                    with benchmark.isolated_data_dir(data_dir):
+                        report = loadtest.run(targets, options['rate'], options['duration'], locations,
+                                              engine=options['engine'], seed=options['seed'])
+            finally:
+                # Leave no load test entries behind in the shared tables.
+                History.objects.filter(event=loadtest.LOADTEST_EVENT).delete()
+                GeocodeCache.objects.filter(city__startswith='Fake City').delete()
+            report['upstream_requests'] = dict(upstreams.requests)
+            report['upstream_errors'] = dict(upstreams.errors)
+
+        report = {'started_at': datetime.now().isoformat(), 'options': {**run_options, 'targets': targets}, **report}
+        self.write_report(report)
+        if options['output']:
+            output = Path(options['output'])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {output}."))
+
+    def write_report(self, report):
+        self.stdout.write(f"{report['completed']}/{report['requests']} requests in {report['elapsed_s']} s: "
+                          f"{report['throughput_rps']} req/s (offered {report['offered_rps']}, sent {report['sent_rps']})")
+        for target, result in report['targets'].items():
+            latency = result['latency'] or {}
+            self.stdout.write(f"  {target:<12} p50 {latency.get('p50_ms')} ms, p90 {latency.get('p90_ms')} ms, "
+                              f"p99 {latency.get('p99_ms')} ms, max {latency.get('max_ms')} ms; "
+                              f"statuses {result['statuses']}")
+        lag = report['event_loop_lag'] or {}
+        self.stdout.write(f"  event loop lag p50 {lag.get('p50_ms')} ms, p99 {lag.get('p99_ms')} ms, max {lag.get('max_ms')} ms")
+        for name, mean in report['server_timing_mean_ms'].items():
+            self.stdout.write(f"    {name:<24} {mean:10.1f} ms")
@@ -0,0 +1,67 @@
+"""
+Pre-fetches NASA POWER history and pre-fits the forecast models for popular locations.
+
+Locations are the most frequent grid cells in the History table plus the ones listed
+in the FORECAST_WARM_LOCATIONS setting. Run it once, from cron, or with --interval to
+keep it running as a periodic background task:
+
+    python manage.py warm_forecast_cache --top 20 --concurrency 2 --interval 3600
+"""
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from userside.data_store import snap_to_grid
+from userside.models import History
+from userside.weather_model import FORECAST_ENGINES, warm_location
+
+
+class Command(BaseCommand):
+    help = "Refreshes NASA POWER history and precomputes forecasts for the most requested locations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=settings.FORECAST_WARM_TOP_LOCATIONS,
+                            help="Number of most frequent History locations to warm.")
+        parser.add_argument('--concurrency', type=int, default=settings.FORECAST_WARM_CONCURRENCY,
+                            help="Number of locations warmed at the same time.")
+        parser.add_argument('--engine', choices=FORECAST_ENGINES, default=None,
+                            help="Forecast engine to precompute (defaults to FORECAST_ENGINE).")
+        parser.add_argument('--interval', type=int, default=None,
+                            help="Repeat every INTERVAL seconds instead of running once.")
+
+    def handle(self, *args, **options):
+        while True:
+            locations = self.popular_locations(options['top'])
+            self.stdout.write(f"Warming {len(locations)} locations...")
+            started = time.monotonic()
+            asyncio.run(self.warm(locations, options['engine'], options['concurrency']))
+            self.stdout.write(self.style.SUCCESS(f"Done in {time.monotonic() - started:.1f}s."))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def popular_locations(self, top):
+        """Returns grid cells ordered by popularity, configured locations first."""
+        rows = (History.objects.filter(cell_lat__isnull=False)
+                .values('cell_lat', 'cell_lon').annotate(requests=Count('id')).order_by('-requests'))
+        popular = [(row['cell_lat'], row['cell_lon']) for row in rows[:top]]
+
+        configured = [snap_to_grid(lat, lon) for lat, lon in settings.FORECAST_WARM_LOCATIONS]
+        return list(dict.fromkeys(configured + popular))
+
+    async def warm(self, locations, engine, concurrency):
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def warm_one(lat, lon):
+            async with semaphore:
+                try:
+                    await warm_location(lat, lon, engine)
+                    self.stdout.write(f"  {lat}, {lon}: ok")
+                except Exception as e:
+                    self.stderr.write(f"  {lat}, {lon}: failed ({e})")
+
+        await asyncio.gather(*(warm_one(lat, lon) for lat, lon in locations))
@@ -0,0 +1,183 @@
+"""
+Request stage timings and Prometheus metrics.
+
+Every slow step of a forecast (history download, each model fit, geocoding, the
+Gemini call, ...) is wrapped in `stage(name)`. A stage is recorded in two places:
+
+- The current request's stage list. It is kept in a context variable, so it
+  follows the request through its tasks and `sync_to_async` threads. Views
+  wrapped with `timed_view` send that list back in a `Server-Timing` header.
+- A process-wide latency histogram, served with the cache hit/miss counters in
+  the Prometheus text format by the /metrics view.
+
+Recording is a few dictionary updates under a lock, so it is cheap enough for
+the hot path. Metrics are kept per process.
+"""
+import bisect
+import functools
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# (stage name, seconds) pairs recorded for the current request, or None outside a timed view.
+_request_stages = ContextVar('request_stages', default=None)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """A monotonically increasing count, optionally split by label values."""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """A latency histogram with cumulative buckets, optionally split by label values."""
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labels + ('le',), label_values + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels + ('le',), label_values + ('+Inf',))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram('itwillruin_stage_duration_seconds',
+                          "Time spent in each forecast stage.", labels=('stage',))
+REQUEST_SECONDS = Histogram('itwillruin_request_duration_seconds',
+                            "Time spent in the timed views.", labels=('view', 'status'))
+CACHE_REQUESTS = Counter('itwillruin_cache_requests_total',
+                         "Cache lookups by cache and result (hit or miss).", labels=('cache', 'result'))
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, CACHE_REQUESTS]
+
+
+def record_stage(name, seconds):
+    """Records a stage timing that was measured elsewhere, e.g. in a worker process."""
+    STAGE_SECONDS.observe(seconds, name)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block as a stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def cache_result(cache, hit):
+    """Counts a lookup in one of the application caches."""
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+def server_timing_header(stages, total=None):
+    """
+    Formats (name, seconds) stage timings as a Server-Timing header value. Stages
+    recorded more than once (e.g. from retries) are summed.
+    """
+    durations = {}
+    for name, seconds in stages:
+        durations[name] = durations.get(name, 0.0) + seconds
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)};dur={seconds * 1000:.1f}"
+                     for name, seconds in durations.items())
+
+
+def timed_view(view):
+    """
+    Wraps an async view so its stages are collected and returned in a Server-Timing
+    header, and its total latency is recorded.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        stages = []
+        token = _request_stages.set(stages)
+        started = time.perf_counter()
+        try:
+            response = await view(request, *args, **kwargs)
+        finally:
+            _request_stages.reset(token)
+        total = time.perf_counter() - started
+        REQUEST_SECONDS.observe(total, view.__name__, response.status_code)
+        response['Server-Timing'] = server_timing_header(stages, total)
+        return response
+
+    return wrapper
+
+
+def render():
+    """Returns every metric in the Prometheus text exposition format."""
+    from . import llm_cache
+
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+
+    # The LLM cache keeps its own counters; they are read here instead of on every lookup.
+    cache = llm_cache.get_cache()
+    lines += [
+        "# HELP itwillruin_llm_cache_requests_total LLM result cache lookups by result.",
+        "# TYPE itwillruin_llm_cache_requests_total counter",
+        f'itwillruin_llm_cache_requests_total{{result="hit"}} {cache.hits}',
+        f'itwillruin_llm_cache_requests_total{{result="miss"}} {cache.misses}',
+    ]
+    return '\n'.join(lines) + '\n'
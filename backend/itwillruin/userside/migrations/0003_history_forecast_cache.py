@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:25
+
+from django.db import migrations, models
+
+# The NASA POWER grid when this migration was written: 0.5 by 0.625 degrees.
+GRID_LAT_STEP = 0.5
+GRID_LON_STEP = 0.625
+
+
+def snap_to_grid(lat, lon):
+    lat = round(float(lat) / GRID_LAT_STEP) * GRID_LAT_STEP
+    lon = round((float(lon) + 180) / GRID_LON_STEP) * GRID_LON_STEP - 180
+    return min(max(lat, -90.0), 90.0), round(lon, 4)
+
+
+def fill_grid_cells(apps, schema_editor):
+    History = apps.get_model('userside', 'History')
+    for entry in History.objects.filter(cell_lat__isnull=True):
+        entry.cell_lat, entry.cell_lon = snap_to_grid(entry.lat, entry.lon)
+        entry.save(update_fields=['cell_lat', 'cell_lon'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userside', '0002_geocodecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='history',
+            name='cell_lat',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='history',
+            name='cell_lon',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='history',
+            name='engine',
+            field=models.CharField(default='sarimax', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='history',
+            index=models.Index(fields=['cell_lat', 'cell_lon', 'date'], name='userside_hi_cell_la_72e086_idx'),
+        ),
+        migrations.RunPython(fill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userside', '0003_history_forecast_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='history',
+            name='location_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,112 @@
+"""
+Persistent cache of fitted forecast model parameters.
+
+Fitting a SARIMAX model is by far the most expensive step of a forecast, while the
+optimal parameters for a (location, variable, training window) barely move from one
+day to the next. The fitted parameters are stored here as small JSON files, one per
+training window, so horizons that train on different windows keep separate fits.
+Later forecasts can reuse them: the model is only re-run through the Kalman filter
+to take in new observations, and fully re-optimised once the parameters are older
+than FORECAST_REFIT_AFTER_DAYS or were fitted with different seasonal terms.
+
+The full forecast path computed from a fit is cached as well, so any date inside its
+horizon can be answered without touching the model again.
+
+These functions are called from the fit worker processes, so all state lives on disk.
+"""
+import json
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+
+from .data_store import write_atomically
+
+
+def params_path(location, variable, window=None):
+    """
+    Returns the path of the cached parameters for a location and variable trained on
+    the last `window` days (all history if None).
+    """
+    return Path(settings.WEATHER_DATA_DIR) / 'models' / location / f"{variable}_{window or 'all'}.json"
+
+
+def load_params(location, variable, window=None):
+    """
+    Loads the cached fit for a location and variable trained on the last `window` days.
+
+    Returns:
+        A dictionary with 'params' (name -> value), 'fitted_at' (ISO timestamp),
+        'last_date' (last observation used in the fit) and 'training' (the training
+        options of the fit), or None if nothing is cached.
+    """
+    path = params_path(location, variable, window)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_json(path, entry):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+
+    write_atomically(path, write, suffix='.json.tmp')
+
+
+def save_params(location, variable, params, last_date, training=None):
+    """Stores fitted parameters (a pandas Series indexed by parameter name) under their training window."""
+    _write_json(params_path(location, variable, (training or {}).get('window')), {
+        'params': {name: float(value) for name, value in params.items()},
+        'fitted_at': datetime.now().isoformat(),
+        'last_date': str(last_date.date()),
+        'training': training,
+    })
+
+
+def is_stale(entry):
+    """Returns True if a cached fit is due for a full re-optimisation."""
+    max_age = timedelta(days=getattr(settings, 'FORECAST_REFIT_AFTER_DAYS', 7))
+    return datetime.now() - datetime.fromisoformat(entry['fitted_at']) > max_age
+
+
+def forecast_path_path(location, engine):
+    """Returns the path of the cached forecast path for a (location, engine) pair."""
+    return Path(settings.WEATHER_DATA_DIR) / 'models' / location / f"path_{engine}.json"
+
+
+def load_forecast_path(location, engine, last_date, training=None):
+    """
+    Loads the cached forecast path for a location and engine.
+
+    Returns:
+        The DataFrame stored by `save_forecast_path`, or None if nothing is cached,
+        the path was computed from data that ended before `last_date`, or with
+        training settings other than `training`.
+    """
+    try:
+        with open(forecast_path_path(location, engine)) as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if entry['last_date'] != str(last_date.date()) or entry.get('training') != training:
+        return None
+
+    path = pd.read_json(StringIO(entry['path']), orient='split')
+    path.columns = pd.MultiIndex.from_tuples([tuple(column) for column in path.columns])
+    path.index = pd.to_datetime(path.index)
+    return path
+
+
+def save_forecast_path(location, engine, path, last_date, training=None):
+    """Stores a forecast path (a DataFrame with (variable, statistic) columns)."""
+    _write_json(forecast_path_path(location, engine), {
+        'last_date': str(last_date.date()),
+        'training': training,
+        'computed_at': datetime.now().isoformat(),
+        'path': path.to_json(orient='split', date_format='iso'),
+    })
@@ -4,9 +4,29 @@ from django.db import models
 class History(models.Model):
     lat = models.FloatField()
     lon = models.FloatField()
+    # Centre of the NASA POWER grid cell containing (lat, lon); completed forecasts
+    # are looked up by cell and date.
+    cell_lat = models.FloatField(null=True)
+    cell_lon = models.FloatField(null=True)
     forecast_prediction = models.JSONField()
     ai_insights = models.JSONField()
     date = models.DateField()
     event = models.CharField(max_length=255)
+    # Place name the AI insights were written for; other points in the same cell
+    # reuse the forecast but get their own insights.
+    location_name = models.CharField(max_length=255, blank=True, default='')
+    engine = models.CharField(max_length=20, default='sarimax')
     created_at = models.DateTimeField(auto_now_add=True)
-    
\ No newline at end of file
+
+    class Meta:
+        indexes = [models.Index(fields=['cell_lat', 'cell_lon', 'date'])]
+
+
+class GeocodeCache(models.Model):
+    lat = models.FloatField()
+    lon = models.FloatField()
+    city = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['lat', 'lon'])]
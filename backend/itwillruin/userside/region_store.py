@@ -0,0 +1,168 @@
+"""
+Gridded NASA POWER history for whole regions.
+
+A region is a bounding box whose grid cells are downloaded together (see the
+`ingest_region` command) and stored as one NetCDF cube per region under
+WEATHER_DATA_DIR/regions, with one (time, lat, lon) float32 variable per
+parameter. Each cell's series is stored as one contiguous chunk. Cubes are opened
+lazily once per process, so answering a point only reads that cell's chunk from
+disk. Any number of locations inside the box share a single ingestion.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from django.conf import settings
+
+from .data_store import GRID_LAT_STEP, GRID_LON_STEP, snap_to_grid, write_atomically
+
+# A cell is only served, and not downloaded again from the start, if at least
+# this share of its days have every parameter.
+MIN_VALID_FRACTION = 0.9
+
+# Cubes opened in this process, keyed by path: (modification time, dataset).
+_cubes = {}
+
+
+def regions_dir():
+    """Returns the directory holding the region cubes."""
+    return Path(settings.WEATHER_DATA_DIR) / 'regions'
+
+
+def region_path(name):
+    """Returns the path of the cube for a region."""
+    return regions_dir() / f"{name}.nc"
+
+
+def grid_points(min_lat, min_lon, max_lat, max_lon):
+    """Returns the sorted latitudes and longitudes of the grid cell centres inside a bounding box."""
+    min_lat, min_lon = snap_to_grid(min_lat, min_lon)
+    max_lat, max_lon = snap_to_grid(max_lat, max_lon)
+    lats = np.round(np.arange(min_lat, max_lat + GRID_LAT_STEP / 2, GRID_LAT_STEP), 4)
+    lons = np.round(np.arange(min_lon, max_lon + GRID_LON_STEP / 2, GRID_LON_STEP), 4)
+    return lats, lons
+
+
+def build_cube(lats, lons, frames, fetched_through):
+    """
+    Assembles per-cell daily DataFrames into a cube.
+
+    Args:
+        frames: A dict mapping (lat, lon) to a DataFrame indexed by date with one
+            column per parameter.
+    """
+    times = pd.DatetimeIndex(sorted(set().union(*(df.index for df in frames.values()))))
+    variables = sorted(set().union(*(df.columns for df in frames.values())))
+    data = {var: np.full((len(times), len(lats), len(lons)), np.nan, dtype='float32') for var in variables}
+    for (lat, lon), df in frames.items():
+        i, j = np.searchsorted(lats, lat), np.searchsorted(lons, lon)
+        df = df.reindex(index=times, columns=variables)
+        for var in variables:
+            data[var][:, i, j] = df[var].to_numpy(dtype='float32')
+
+    cube = xr.Dataset(
+        {var: (('time', 'lat', 'lon'), values) for var, values in data.items()},
+        coords={'time': times, 'lat': lats, 'lon': lons},
+    )
+    cube.attrs['fetched_through'] = pd.Timestamp(fetched_through).strftime('%Y-%m-%d')
+    return trim_trailing_gaps(cube)
+
+
+def valid_fraction(cube):
+    """Returns, for every (lat, lon) cell, the share of days on which every parameter has a value."""
+    complete = None
+    for var in cube.data_vars:
+        present = cube[var].notnull()
+        complete = present if complete is None else complete & present
+    return complete.mean(dim='time').values
+
+
+def complete_cells(cube):
+    """Returns a (lat, lon) boolean mask of the cells with at least MIN_VALID_FRACTION valid days."""
+    return valid_fraction(cube) >= MIN_VALID_FRACTION
+
+
+def trim_trailing_gaps(cube):
+    """
+    Drops trailing days on which any complete cell misses any parameter, like
+    `data_store.trim_trailing_gaps`, so they are downloaded again on the next run.
+    Cells that failed to download are ignored.
+    """
+    cells = complete_cells(cube)
+    if not cells.any():
+        return cube
+    valid = np.ones(cube.sizes['time'], dtype=bool)
+    for var in cube.data_vars:
+        valid &= cube[var].notnull().values[:, cells].all(axis=1)
+    if not valid.any():
+        return cube
+    return cube.isel(time=slice(0, np.flatnonzero(valid)[-1] + 1))
+
+
+def save_cube(name, cube):
+    """Writes a region cube, replacing any previous one."""
+    encoding = {
+        var: {'dtype': 'float32', '_FillValue': np.float32(np.nan),
+              'chunksizes': (cube.sizes['time'], 1, 1)}
+        for var in cube.data_vars
+    }
+    path = region_path(name)
+
+    def write(tmp_path):
+        cube.to_netcdf(tmp_path, encoding=encoding)
+        # The open copy of the old cube holds a file handle; release it before the file is replaced.
+        close_cube(path)
+
+    write_atomically(path, write)
+
+
+def close_cube(path):
+    """Closes the cube opened for path in this process, if any."""
+    cached = _cubes.pop(Path(path), None)
+    if cached is not None:
+        cached[1].close()
+
+
+def open_cube(path):
+    """Returns the lazily opened cube at path, reopening it if the file has changed."""
+    path = Path(path)
+    mtime = path.stat().st_mtime
+    cached = _cubes.get(path)
+    if cached is None or cached[0] != mtime:
+        close_cube(path)
+        cached = _cubes[path] = (mtime, xr.open_dataset(path))
+    return cached[1]
+
+
+def load_cube(name):
+    """Returns a region's cube, or None if it has not been ingested."""
+    path = region_path(name)
+    return open_cube(path) if path.exists() else None
+
+
+def load_point(lat, lon):
+    """
+    Looks up the history of the grid cell containing (lat, lon) in the region cubes.
+
+    Returns:
+        A tuple of (DataFrame indexed by date, Timestamp the region was last
+        downloaded through), or (None, None) if no region covers the point.
+    """
+    if not regions_dir().exists():
+        return None, None
+    lat, lon = snap_to_grid(lat, lon)
+
+    for path in sorted(regions_dir().glob('*.nc')):
+        cube = open_cube(path)
+        try:
+            point = cube.sel(lat=lat, lon=lon, method='nearest', tolerance=1e-3)
+        except KeyError:
+            continue
+        df = point.drop_vars(['lat', 'lon']).to_dataframe().astype('float64')
+        if df.empty or df.notna().all(axis=1).mean() < MIN_VALID_FRACTION:
+            # This cell failed to download, completely or in part, during ingestion.
+            continue
+        df.index.name = None
+        return df, pd.Timestamp(cube.attrs['fetched_through'])
+    return None, None
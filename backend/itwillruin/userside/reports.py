@@ -0,0 +1,209 @@
+"""
+PDF event reports rendered in a background worker pool.
+
+The report HTML (`report_template.html`) is rendered with the Django template
+engine in the web process. Converting it to PDF with xhtml2pdf is CPU-heavy, so
+that step runs in a separate process pool and never blocks the event loop.
+Finished PDFs are stored under WEATHER_DATA_DIR/reports, named after a hash of
+the report content. Asking again for the same forecast returns the existing file.
+
+The status of queued and failed reports is kept in the 'reports' cache for
+REPORT_JOB_TTL seconds, so any server process can answer a poll when that cache
+is shared; rendered reports are found on disk. A rendered report that has not
+been asked for in REPORT_JOB_TTL seconds is deleted when the next one is queued.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+
+from .data_store import write_atomically
+
+logger = logging.getLogger(__name__)
+
+REPORT_TEMPLATE = 'report_template.html'
+
+REPORT_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# Report rows: (template key, forecast variable, value thresholds and their conditions).
+REPORT_METRICS = (
+    ('temperature', 'T2M', ((30, "Hot"), (20, "Warm"), (10, "Mild"), (float('-inf'), "Cold"))),
+    ('rainfall', 'PRECTOTCORR', ((10, "Heavy rain"), (1, "Light rain"), (float('-inf'), "Dry"))),
+    ('windspeed', 'WS10M', ((10, "Strong wind"), (5, "Breezy"), (float('-inf'), "Calm"))),
+    ('humidity', 'RH2M', ((70, "Humid"), (30, "Comfortable"), (float('-inf'), "Dry"))),
+)
+
+
+class ReportDataError(ValueError):
+    """Raised when the forecast has no data for the report date."""
+
+
+def reports_dir():
+    """Returns the directory holding the rendered reports."""
+    return Path(settings.WEATHER_DATA_DIR) / 'reports'
+
+
+def is_report_id(value):
+    """Returns True if value has the form of a report id."""
+    return bool(REPORT_ID_PATTERN.fullmatch(value))
+
+
+def report_path(report_id):
+    """Returns the path of the PDF for a report id."""
+    return reports_dir() / f"{report_id}.pdf"
+
+
+def _condition(value, thresholds):
+    for threshold, condition in thresholds:
+        if value is not None and value >= threshold:
+            return condition
+    return "Unknown"
+
+
+def build_report_data(weather_data, ai_insights, location, date_str):
+    """
+    Collects the template data for a report. `weather_data` must hold a
+    'forecast_range' starting on the report date, which provides the expected range
+    of each metric (see `weather_model.get_weather_prediction_for_day`).
+    """
+    forecast_range = weather_data.get('forecast_range')
+    if not forecast_range:
+        raise ReportDataError(f"No forecast data for {date_str}")
+    day = forecast_range[0]['variables']
+    day_data = {}
+    for key, variable, thresholds in REPORT_METRICS:
+        values = day[variable]
+        day_data[key] = {
+            'value': values['mean'],
+            'lower': values['lower'] if values['lower'] is not None else values['mean'],
+            'upper': values['upper'] if values['upper'] is not None else values['mean'],
+            'condition': _condition(values['mean'], thresholds),
+        }
+    return {
+        'location': location,
+        'date': date_str,
+        'day_data': day_data,
+        'ai_insights': ai_insights or {},
+    }
+
+
+def report_id_for(report_data):
+    """Returns the id of a report: the SHA-256 of its content."""
+    content = json.dumps(report_data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def render_html(report_data):
+    """Renders the report HTML with the Django template engine."""
+    return render_to_string(REPORT_TEMPLATE, {**report_data, 'generation_date': datetime.now().strftime('%Y-%m-%d')})
+
+
+def render_pdf(html, path):
+    """
+    Converts report HTML to a PDF file at path. Runs in a report worker process.
+    The PDF is written to a temporary file first, so a half-written report is never served.
+    """
+    # Imported here: xhtml2pdf is only needed in the worker processes.
+    from xhtml2pdf import pisa
+
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            result = pisa.CreatePDF(html, dest=f, encoding='utf-8')
+        if result.err:
+            raise RuntimeError(f"xhtml2pdf reported {result.err} errors")
+
+    write_atomically(path, write, suffix='.pdf.tmp')
+    return str(path)
+
+
+_executor = None
+
+PENDING = 'pending'
+FAILED = 'failed'
+
+
+def get_report_executor():
+    """Returns the process pool that renders the PDFs, creating it on first use."""
+    global _executor
+    if _executor is None:
+        # 'spawn' avoids forking a process that already runs server threads.
+        _executor = ProcessPoolExecutor(max_workers=settings.REPORT_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def _job_cache():
+    return caches['reports']
+
+
+def _job_key(report_id):
+    return f"report:{report_id}"
+
+
+def report_status(report_id):
+    """Returns 'ready', 'pending', 'failed' or 'unknown' for a report id."""
+    if report_path(report_id).exists():
+        return 'ready'
+    status = _job_cache().get(_job_key(report_id))
+    if status is None:
+        return 'unknown'
+    # The job may have finished between the two checks.
+    return 'ready' if report_path(report_id).exists() else status
+
+
+def submit_report(report_data):
+    """
+    Queues a report for rendering unless it is already rendered or in progress.
+
+    Returns:
+        A tuple of (report id, status).
+    """
+    evict_expired_reports()
+    report_id = report_id_for(report_data)
+    status = report_status(report_id)
+    if status == 'ready':
+        try:
+            # Asking for a report again keeps it for another REPORT_JOB_TTL.
+            os.utime(report_path(report_id))
+            return report_id, status
+        except FileNotFoundError:
+            status = 'unknown'
+    if status == 'pending':
+        return report_id, status
+
+    html = render_html(report_data)
+    _job_cache().set(_job_key(report_id), PENDING, settings.REPORT_JOB_TTL)
+    job = get_report_executor().submit(render_pdf, html, str(report_path(report_id)))
+    job.add_done_callback(lambda done: _job_done(report_id, done))
+    return report_id, PENDING
+
+
+def evict_expired_reports():
+    """Deletes the rendered reports that have not been asked for in REPORT_JOB_TTL seconds."""
+    cutoff = time.time() - settings.REPORT_JOB_TTL
+    for path in reports_dir().glob('*.pdf'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            continue
+
+
+def _job_done(report_id, job):
+    # Finished reports are found on disk; only failures are kept, so they can be reported.
+    if job.exception() is not None:
+        logger.error(f"Rendering report {report_id} failed: {job.exception()}")
+        _job_cache().set(_job_key(report_id), FAILED, settings.REPORT_JOB_TTL)
+    else:
+        _job_cache().delete(_job_key(report_id))
@@ -0,0 +1,124 @@
+"""
+Pre-seeded daily history converted from bundled datasets such as `Data/cairo_weather.xlsx`.
+
+Spreadsheets are slow to parse, so each dataset is converted once (see the
+`import_weather_dataset` command) into a directory of NumPy column files:
+`dates.npy` with the dates, one float64 `.npy` file per parameter, and a
+`meta.json` describing the source. The directory is keyed by the NASA POWER grid
+cell of the dataset, which registers it as the seed for that cell. The files are
+stored in the dtypes the DataFrame uses, so loading only memory-maps them: the
+DataFrame is built on the mapped arrays without copying or parsing anything.
+
+`weather_model.fetch_historical_daily_data` uses a seed in place of the initial
+NASA POWER download when a cell has no stored history yet.
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .data_store import location_key, snap_to_grid
+
+# Column names used by older NASA POWER exports, mapped to the current parameter names.
+COLUMN_ALIASES = {
+    'PRECTOT': 'PRECTOTCORR',
+}
+
+# Day resolution is not a pandas index resolution, so dates are stored in seconds.
+SEED_DATE_DTYPE = 'datetime64[s]'
+
+# Seeds already opened in this process, keyed by location.
+_seeds = {}
+
+
+def seed_dir(lat, lon):
+    """Returns the directory holding the seed for a location."""
+    return Path(settings.WEATHER_DATA_DIR) / 'seeds' / location_key(lat, lon)
+
+
+def read_dataset(path, date_column='Date'):
+    """
+    Reads a daily dataset (.xlsx, .xls or .csv) with one row per day.
+
+    Returns:
+        A DataFrame indexed by date with one float column per parameter. Missing
+        values (-999) are returned as NaN.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_excel(path)
+
+    df[date_column] = pd.to_datetime(df[date_column])
+    df = df.set_index(date_column).sort_index()
+    df.index.name = None
+    df = df.rename(columns=COLUMN_ALIASES).select_dtypes('number').astype('float64')
+    df.replace(-999, np.nan, inplace=True)
+    return df
+
+
+def write_seed(lat, lon, df, source):
+    """Writes a daily DataFrame as the seed for the grid cell containing (lat, lon)."""
+    lat, lon = snap_to_grid(lat, lon)
+    df = df.asfreq('D')
+    path = seed_dir(lat, lon)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Build the new seed next to the old one and swap it in, so readers never see a partial seed.
+    tmp_path = Path(tempfile.mkdtemp(dir=path.parent, suffix='.tmp'))
+    try:
+        np.save(tmp_path / 'dates.npy', df.index.values.astype(SEED_DATE_DTYPE))
+        for column in df.columns:
+            np.save(tmp_path / f"{column}.npy", df[column].to_numpy(dtype='float64'))
+        with open(tmp_path / 'meta.json', 'w') as f:
+            json.dump({
+                'source': str(source),
+                'lat': lat,
+                'lon': lon,
+                'columns': list(df.columns),
+                'start': df.index.min().strftime('%Y-%m-%d'),
+                'end': df.index.max().strftime('%Y-%m-%d'),
+                'imported_at': datetime.now().isoformat(),
+            }, f, indent=2)
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+
+    _seeds.pop(location_key(lat, lon), None)
+    return path
+
+
+def load_seed(lat, lon):
+    """
+    Returns the seeded daily history for a location as a DataFrame indexed by date,
+    or None if no dataset has been imported for its grid cell.
+    """
+    lat, lon = snap_to_grid(lat, lon)
+    key = location_key(lat, lon)
+    if key in _seeds:
+        return _seeds[key]
+
+    path = seed_dir(lat, lon)
+    try:
+        with open(path / 'meta.json') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    dates = np.load(path / 'dates.npy', mmap_mode='r')
+    columns = {column: np.load(path / f"{column}.npy", mmap_mode='r') for column in meta['columns']}
+    # The mapped files are read-only, so the cached DataFrame cannot be modified in place.
+    df = pd.DataFrame(columns, index=pd.DatetimeIndex(dates, copy=False), copy=False)
+    _seeds[key] = df
+    return df
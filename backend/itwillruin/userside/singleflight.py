@@ -0,0 +1,40 @@
+"""
+Coalescing of concurrent identical work.
+
+When a burst of users asks for the same thing at once, only the first call does
+the work; every other caller with the same key awaits the same result.
+"""
+import asyncio
+import weakref
+
+
+class SingleFlight:
+    """
+    Runs at most one coroutine per key at a time and shares its result with
+    every caller that asks for the same key while it is in flight.
+    """
+
+    def __init__(self):
+        # Tasks belong to an event loop, so in-flight calls are tracked per loop.
+        self._calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key, func, *args, **kwargs):
+        """
+        Awaits `func(*args, **kwargs)`, or the already running call for `key`.
+        A caller that is cancelled does not cancel the shared call.
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+
+        task = calls.get(key)
+        if task is None:
+            task = loop.create_task(func(*args, **kwargs))
+            calls[key] = task
+
+            def _forget(finished):
+                if calls.get(key) is finished:
+                    del calls[key]
+
+            task.add_done_callback(_forget)
+
+        return await asyncio.shield(task)
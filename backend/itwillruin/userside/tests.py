@@ -1,3 +1,378 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from . import benchmark, data_store, geocode_cache, reports, weather_model
+from .llm_cache import QuantizedCache, cached_by_quantized_inputs, quantize, step_for
+from .models import GeocodeCache
+from .singleflight import SingleFlight
+
+
+def daily_frame(start, days, columns=('T2M', 'PRECTOTCORR')):
+    index = pd.date_range(start, periods=days, freq='D')
+    return pd.DataFrame({column: np.arange(days, dtype='float64') + i for i, column in enumerate(columns)},
+                        index=index)
+
+
+class DataStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(WEATHER_DATA_DIR=self.data_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.data_dir)
+
+    def test_snap_to_grid_returns_the_cell_centre(self):
+        self.assertEqual(data_store.snap_to_grid(30.1, 31.2), (30.0, 31.25))
+        self.assertEqual(data_store.snap_to_grid(30.1, 31.2), data_store.snap_to_grid(29.9, 31.4))
+
+    def test_save_and_load_round_trip(self):
+        df = daily_frame('2024-01-01', 10)
+        data_store.save_history(30.0, 31.25, df, '2024-01-12')
+
+        loaded, fetched_through = data_store.load_history(30.0, 31.25)
+        pd.testing.assert_frame_equal(loaded, df, check_freq=False, check_index_type=False)
+        self.assertEqual(fetched_through, pd.Timestamp('2024-01-12'))
+        self.assertEqual(set(loaded.dtypes), {np.dtype('float64')})
+
+    def test_load_without_stored_history(self):
+        self.assertEqual(data_store.load_history(0.0, 0.0), (None, None))
+
+    def test_save_trims_trailing_gaps(self):
+        df = daily_frame('2024-01-01', 10)
+        df.iloc[-2:, 1] = np.nan
+        data_store.save_history(30.0, 31.25, df, '2024-01-10')
+
+        loaded, _ = data_store.load_history(30.0, 31.25)
+        self.assertEqual(loaded.index.max(), pd.Timestamp('2024-01-08'))
+
+    def test_trim_trailing_gaps(self):
+        df = daily_frame('2024-01-01', 5)
+        df.iloc[2, 0] = np.nan
+        df.iloc[4, 1] = np.nan
+        trimmed = data_store.trim_trailing_gaps(df)
+        # A gap inside the series is kept; only the trailing incomplete day goes.
+        self.assertEqual(trimmed.index.max(), pd.Timestamp('2024-01-04'))
+        self.assertTrue(np.isnan(trimmed.iloc[2, 0]))
+
+    def test_trim_trailing_gaps_ignores_empty_columns(self):
+        df = daily_frame('2024-01-01', 5)
+        df['RH2M'] = np.nan
+        self.assertEqual(len(data_store.trim_trailing_gaps(df)), 5)
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def test_concurrent_calls_share_one_run(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value * 2
+
+        async def main():
+            return await asyncio.gather(*(flight.do('key', work, 21) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(main()), [42] * 5)
+        self.assertEqual(calls, [21])
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        async def main():
+            return await asyncio.gather(flight.do('a', work, 1), flight.do('b', work, 2))
+
+        self.assertEqual(asyncio.run(main()), [1, 2])
+        self.assertEqual(sorted(calls), [1, 2])
+
+    def test_finished_calls_are_not_reused(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(None)
+            return len(calls)
+
+        async def main():
+            return [await flight.do('key', work), await flight.do('key', work)]
+
+        self.assertEqual(asyncio.run(main()), [1, 2])
+
+    def test_cancelled_caller_does_not_cancel_the_shared_call(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        async def main():
+            first = asyncio.create_task(flight.do('key', work))
+            second = asyncio.create_task(flight.do('key', work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(main()), 'done')
+
+
+class QuantizedCacheTests(SimpleTestCase):
+
+    def test_steps_follow_the_argument_name(self):
+        self.assertEqual(step_for('rain_chance'), 10)
+        self.assertEqual(step_for('Temperature'), 1)
+        self.assertEqual(step_for('humidity'), 5)
+        self.assertEqual(step_for('something_else'), 1)
+
+    def test_quantize_buckets_values(self):
+        self.assertEqual(quantize('temperature', 24.3), quantize('temperature', 23.8))
+        self.assertNotEqual(quantize('temperature', 24.3), quantize('temperature', 25.6))
+        self.assertEqual(quantize('rain_chance', 42), quantize('rain_chance', 38))
+        self.assertEqual(quantize('city', '  Cairo '), quantize('city', 'cairo'))
+        self.assertEqual(quantize('data', {'temp': 24.3, 'rain': 42}), quantize('data', {'rain': 38, 'temp': 23.8}))
+        self.assertIsNone(quantize('anything', None))
+
+    def test_cache_counts_hits_and_misses(self):
+        cache = QuantizedCache(maxsize=2, ttl=60)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_decorated_function_is_cached_under_bucketed_inputs(self):
+        calls = []
+
+        @cached_by_quantized_inputs
+        def advice(temperature, city):
+            calls.append((temperature, city))
+            return {'advice': f"{city} at {temperature}"}
+
+        with mock.patch('userside.llm_cache._cache', QuantizedCache(maxsize=8, ttl=60)):
+            first = advice(24.3, 'Cairo')
+            self.assertEqual(advice(23.8, ' cairo'), first)
+            advice(30, 'Cairo')
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_are_not_cached(self):
+        calls = []
+
+        @cached_by_quantized_inputs
+        def advice(temperature):
+            calls.append(temperature)
+            return {'error': 'unavailable'}
+
+        with mock.patch('userside.llm_cache._cache', QuantizedCache(maxsize=8, ttl=60)):
+            advice(20)
+            advice(20)
+        self.assertEqual(len(calls), 2)
+
+
+def fake_prediction(lat, lon, date_str, engine=None, end_date_str=None):
+    return {'date': date_str, 'lat': lat, 'engine': engine, 'historical_comparison_chart': {'years': []}}
+
+
+@mock.patch('userside.views.get_weather_prediction_for_day', side_effect=fake_prediction)
+class StreamForecastApiTests(TestCase):
+
+    async def _stream(self, body):
+        response = await AsyncClient().post(reverse('userside:weather_forecast_stream_api'),
+                                            json.dumps(body), content_type='application/json')
+        lines = [chunk async for chunk in response.streaming_content]
+        return response, [json.loads(line) for line in b''.join(lines).decode().splitlines()]
+
+    @mock.patch('userside.views.get_event_insights', return_value={'summary': 'Sunny'})
+    @mock.patch('userside.views.get_city_from_latlon', new_callable=mock.AsyncMock, return_value='Cairo')
+    def test_stream_sends_sections_in_order(self, city, insights, prediction):
+        body = {'latitude': 30.0, 'longitude': 31.2, 'date': '2026-11-01', 'event_type': 'wedding'}
+        response, lines = asyncio.run(self._stream(body))
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([line['section'] for line in lines],
+                         ['forecast', 'historical_comparison', 'location', 'ai_insights', 'done'])
+        self.assertEqual(lines[0]['request_date'], '2026-11-01')
+        self.assertNotIn('historical_comparison_chart', lines[0]['data'])
+        self.assertEqual(lines[1]['data'], {'years': []})
+        self.assertEqual(lines[2]['data'], 'Cairo')
+        self.assertEqual(lines[3]['data'], {'summary': 'Sunny'})
+
+    @mock.patch('userside.views.get_city_from_latlon', new_callable=mock.AsyncMock, return_value='Cairo')
+    def test_stream_ends_with_an_error_line_when_the_forecast_fails(self, city, prediction):
+        prediction.side_effect = RuntimeError('no history')
+        body = {'latitude': 30.0, 'longitude': 31.2, 'date': '2026-11-01'}
+        with self.assertLogs('userside.views', 'ERROR'):
+            _, lines = asyncio.run(self._stream(body))
+
+        self.assertEqual([line['section'] for line in lines], ['error'])
+        self.assertIn('error', lines[0])
+
+
+class GeocodeCacheTests(TestCase):
+
+    async def test_unknown_names_expire(self):
+        await geocode_cache.store(10.0, 10.0, geocode_cache.UNKNOWN_CITY)
+        self.assertEqual(await geocode_cache.lookup(10.01, 10.01), geocode_cache.UNKNOWN_CITY)
+
+        with override_settings(GEOCODE_UNKNOWN_TTL=-1):
+            self.assertIsNone(await geocode_cache.lookup(10.01, 10.01))
+            await geocode_cache.store(10.02, 10.02, 'Nowhere')
+
+        self.assertEqual([entry.city async for entry in GeocodeCache.objects.all()], ['Nowhere'])
+
+    async def test_names_do_not_expire(self):
+        await geocode_cache.store(10.0, 10.0, 'Somewhere')
+        with override_settings(GEOCODE_UNKNOWN_TTL=-1):
+            self.assertEqual(await geocode_cache.lookup(10.01, 10.01), 'Somewhere')
+
+
+class FillGridCellsMigrationTests(TransactionTestCase):
+    migrate_from = [('userside', '0002_geocodecache')]
+    migrate_to = [('userside', '0003_history_forecast_cache')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        History = executor.loader.project_state(self.migrate_from).apps.get_model('userside', 'History')
+        self.entry_id = History.objects.create(lat=30.1, lon=31.2, forecast_prediction={}, ai_insights={},
+                                               date=date(2026, 11, 1), event='wedding').id
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_rows_get_their_grid_cell(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        History = executor.loader.project_state(self.migrate_to).apps.get_model('userside', 'History')
+
+        entry = History.objects.get(id=self.entry_id)
+        self.assertEqual((entry.cell_lat, entry.cell_lon), data_store.snap_to_grid(30.1, 31.2))
+        self.assertEqual(entry.engine, 'sarimax')
+
+
+@mock.patch('userside.views.get_weather_prediction_for_day', side_effect=fake_prediction)
+class BatchForecastApiTests(TestCase):
+
+    def test_batch_results_are_keyed_by_item_index(self, prediction):
+        items = [
+            {'latitude': 30.0, 'longitude': 31.2, 'date': '2026-11-01', 'event_type': 'wedding'},
+            {'latitude': 'north', 'longitude': 31.2, 'date': '2026-11-01'},
+            {'latitude': 30.1, 'longitude': 31.3, 'date': '2026-11-05'},
+        ]
+        response = self.client.post(reverse('userside:weather_forecast_batch_api'),
+                                    json.dumps({'items': items}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(list(results), ['0', '1', '2'])
+        self.assertEqual(results['0'], {'weather_data': fake_prediction(30.0, 31.2, '2026-11-01'),
+                                        'request_date': '2026-11-01', 'event_type': 'wedding'})
+        self.assertIn('error', results['1'])
+        self.assertEqual(results['2']['request_date'], '2026-11-05')
+        # Both valid items share a grid cell; the furthest date is forecast first.
+        self.assertEqual(prediction.call_args_list[0].args[2], '2026-11-05')
+
+    def test_batch_rejects_bad_requests(self, prediction):
+        url = reverse('userside:weather_forecast_batch_api')
+        self.assertEqual(self.client.post(url, '{}', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, json.dumps({'items': [{}], 'engine': 'magic'}),
+                                          content_type='application/json').status_code, 400)
+        with override_settings(FORECAST_BATCH_MAX_ITEMS=1):
+            self.assertEqual(self.client.post(url, json.dumps({'items': [{}, {}]}),
+                                              content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        prediction.assert_not_called()
+
+
+class ReportTests(SimpleTestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(WEATHER_DATA_DIR=self.data_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.data_dir)
+
+    def test_report_without_forecast_data_is_rejected(self):
+        with self.assertRaises(reports.ReportDataError):
+            reports.build_report_data({'forecast_range': []}, {}, 'Cairo', '1970-01-01')
+
+    def test_reports_not_asked_for_within_the_ttl_are_evicted(self):
+        reports.reports_dir().mkdir(parents=True)
+        old, fresh = reports.report_path('a' * 64), reports.report_path('b' * 64)
+        old.write_bytes(b'%PDF')
+        fresh.write_bytes(b'%PDF')
+        expired = time.time() - 2 * 60 * 60
+        os.utime(old, (expired, expired))
+
+        with override_settings(REPORT_JOB_TTL=60 * 60):
+            reports.evict_expired_reports()
+
+        self.assertFalse(old.exists())
+        self.assertTrue(fresh.exists())
+
+
+class BenchmarkTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.response = benchmark.load_fixture()
+
+    def test_bundled_fixture_is_a_fixed_power_response(self):
+        self.assertEqual(benchmark.fixture_source(self.response), 'bundled')
+        df = weather_model.power_json_to_dataframe(self.response)
+        self.assertEqual(list(df.columns), weather_model.POWER_PARAMETERS.split(','))
+        self.assertEqual((df.index.min(), df.index.max()), (pd.Timestamp('2018-10-01'), pd.Timestamp('2025-09-30')))
+        self.assertEqual(len(df), 2557)
+
+    def test_slice_response_ends_on_the_requested_day(self):
+        sliced = benchmark.slice_response(self.response, '2026-10-16', years=1)
+        df = weather_model.power_json_to_dataframe(sliced)
+        self.assertEqual(df.index.max(), pd.Timestamp('2026-10-16'))
+        self.assertEqual(len(df), 365)
+        # The values are the fixture's last year, only moved in time.
+        original = weather_model.power_json_to_dataframe(self.response)
+        np.testing.assert_array_equal(df.to_numpy(), original.iloc[-365:].to_numpy())
+
+    def test_replayed_power_requests_start_at_the_requested_day(self):
+        upstreams = benchmark.ReplayUpstreams(self.response, years=2)
+        with override_settings(POWER_DAILY_POINT_URL='http://power.test/daily'):
+            response = asyncio.run(upstreams.get_json('http://power.test/daily',
+                                                      params={'start': '20260901', 'end': '20261016'}))
+        df = weather_model.power_json_to_dataframe(response)
+        self.assertEqual((df.index.min(), df.index.max()), (pd.Timestamp('2026-09-01'), pd.Timestamp('2026-10-16')))
+        self.assertEqual(upstreams.calls, 1)
+
+    def test_stage_timings(self):
+        timings = benchmark.benchmark_stages(self.response, years=1, horizon=1)
+        stages = {'json_to_dataframe', 'fit_sarimax.total', 'fit_harmonic.total', 'climatology_table',
+                  'historical_averages', 'hourly_simulation'}
+        stages |= {f'fit_sarimax.{var}' for var in weather_model.FORECAST_VARIABLES}
+        self.assertEqual(set(timings), stages)
+        for summary in timings.values():
+            self.assertEqual(summary['runs'], 1)
+            self.assertGreaterEqual(summary['median_s'], 0)
@@ -13,4 +13,10 @@ urlpatterns = [
     path('ai/', views.insights_view, name='insights'),
     # path('map', views.map, name='weather_planner'),
     path('weather_api/', views.weather_forecast_api, name='weather_forecast_api'),
+    path('weather_api/batch/', views.weather_forecast_batch_api, name='weather_forecast_batch_api'),
+    path('weather_api/stream/', views.weather_forecast_stream_api, name='weather_forecast_stream_api'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('reports/', views.report_api, name='report_api'),
+    path('reports/<str:report_id>/', views.report_status_api, name='report_status_api'),
+    path('reports/<str:report_id>/download/', views.report_download_view, name='report_download'),
 ]
@@ -1,24 +1,42 @@
 
 import os
 import json
+import threading
 import google.generativeai as genai
 from dotenv import load_dotenv
-import requests
 import logging # Using logging is better for production
 from google import genai
 from google.genai import types
+from django.conf import settings
+
+from . import geocode_cache, metrics
+from .llm_cache import cached_by_quantized_inputs
+from .http_client import get_json
+
 # It's good practice to set up a logger
 logger = logging.getLogger(__name__)
 
 
-def get_city_from_latlon(lat, lon):
-    url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=json"
-    response = requests.get(url, headers={"User-Agent": "django-app"})
-    data = response.json()
+async def get_city_from_latlon(lat, lon):
+    lat, lon = float(lat), float(lon)
+    # Nearby points that were resolved before (or are in the offline gazetteer) never hit Nominatim.
+    with metrics.stage('geocode'):
+        return await _resolve_city(lat, lon)
+
+
+async def _resolve_city(lat, lon):
+    cached_city = await geocode_cache.lookup(lat, lon)
+    metrics.cache_result('geocode', cached_city is not None)
+    if cached_city is not None:
+        return cached_city
+
+    with metrics.stage('nominatim'):
+        data = await get_json(settings.NOMINATIM_REVERSE_URL, params={"lat": lat, "lon": lon, "format": "json"})
 
     # Example structure: data["address"]["city"] or ["town"] or ["village"]
     address = data.get("address", {})
-    city = address.get("city") or address.get("town") or address.get("village") or "Unknown"
+    city = address.get("city") or address.get("town") or address.get("village") or geocode_cache.UNKNOWN_CITY
+    await geocode_cache.store(lat, lon, city)
     return city
 
 
@@ -28,198 +46,156 @@ load_dotenv()
 
 
 
-def get_weather_analysis_json(weather_data: dict) -> dict:
+_client = None
+# Insights are generated in worker threads. A second client created by a racing thread
+# would be dropped, and a dropped client closes its connections while still in use.
+_client_lock = threading.Lock()
+
+
+def get_genai_client():
+    """Returns the process-wide Gemini client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            http_options = types.HttpOptions(base_url=settings.GEMINI_BASE_URL) if settings.GEMINI_BASE_URL else None
+            _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"), http_options=http_options)
+        return _client
+
+
+EVENT_INSIGHTS_SYSTEM_PROMPT = """
+You are an expert meteorologist and AI assistant for a NASA Space Apps project called "Will It Rain On My Parade?".
+You are given the forecast for a specific location and date, and the type of event being planned.
+Answer every section of the required JSON object in one response:
+1.  "summary": a friendly, conversational summary of the expected weather.
+2.  "parade_planner": clear, actionable recommendations for someone planning an outdoor event like a parade, hike, or vacation.
+3.  "nasa_fun_fact": a fun fact related to weather, climate, or NASA Earth observation.
+4.  "what_to_wear": a short, practical outfit recommendation with accessories or advice (e.g., bring an umbrella).
+5.  "activity_recommendation": whether the outdoor activity should proceed, backup plans, and any rain warning.
+Be brief, friendly and clear. The "what_to_wear" and "activity_recommendation" texts contain no special chars like @,#,$,%,^,&,*,!,~
+"""
+
+EVENT_INSIGHTS_SCHEMA = genai.types.Schema(
+    type=genai.types.Type.OBJECT,
+    required=["summary", "parade_planner", "nasa_fun_fact", "what_to_wear", "activity_recommendation"],
+    properties={
+        "summary": genai.types.Schema(type=genai.types.Type.STRING),
+        "parade_planner": genai.types.Schema(
+            type=genai.types.Type.OBJECT,
+            required=["overall_outlook", "clothing_recommendation", "contingency_plan"],
+            properties={
+                "overall_outlook": genai.types.Schema(
+                    type=genai.types.Type.STRING,
+                    description="A rating like 'Good', 'Fair with caution', or 'Challenging'.",
+                ),
+                "clothing_recommendation": genai.types.Schema(type=genai.types.Type.STRING),
+                "contingency_plan": genai.types.Schema(type=genai.types.Type.STRING),
+            },
+        ),
+        "nasa_fun_fact": genai.types.Schema(type=genai.types.Type.STRING),
+        "what_to_wear": genai.types.Schema(type=genai.types.Type.STRING),
+        "activity_recommendation": genai.types.Schema(type=genai.types.Type.STRING),
+    },
+)
+
+
+@cached_by_quantized_inputs
+def get_event_insights(weather_data: dict) -> dict:
     """
-    Generates a weather analysis JSON by calling the Gemini API.
+    Generates every AI section of the dashboard with a single structured Gemini call.
 
     Args:
-        weather_data: A dictionary containing weather information.
+        weather_data: A dictionary with the forecast for the event (location, date,
+            condition, temperatures, rain chance, humidity, wind, event type, ...).
+            Every entry is passed to the model.
 
     Returns:
-        A dictionary with the structured weather analysis,
-        or an error dictionary if something goes wrong.
+        A dictionary with 'summary', 'parade_planner', 'nasa_fun_fact', 'what_to_wear'
+        and 'activity_recommendation', or an error dictionary if something goes wrong.
     """
+    json_string = None
     try:
-        # Initialize the client inside the function if you prefer,
-        # or you can initialize it once outside if you're calling this frequently.
-        client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-
-        model_name = "gemini-2.5-pro" # Using 1.5 Pro as it's generally recommended
-
-        # The user's prompt, now correctly formatted inside the function
-        prompt_text = f"""
-        **Input Data:**
-        - Location: {weather_data.get('location', 'N/A')}
-        - Time of Year: {weather_data.get('time_period', 'N/A')}
-        - Average Temperature: {weather_data.get('avg_temp_c', 'N/A')}°C
-        - Chance of Precipitation: {weather_data.get('chance_of_rain_percent', 'N/A')}%
-        - Average Wind Speed: {weather_data.get('avg_wind_speed_kph', 'N/A')} km/h
-        - Typical Dominant Condition: {weather_data.get('dominant_condition', 'N/A')}
-        - Chance of 'Very Hot' (Heat Index Advisory): {weather_data.get('heat_index_advisory_chance_percent', 'N/A')}%
-        """
-
+        prompt_text = "**Input Data:**\n" + "\n".join(
+            f"- {key.replace('_', ' ').capitalize()}: {value if value is not None else 'N/A'}"
+            for key, value in weather_data.items()
+        )
         contents = [
             types.Content(
                 role="user",
                 parts=[types.Part.from_text(text=prompt_text)],
             ),
         ]
-
-        # Your configuration for forcing JSON output
         generate_content_config = types.GenerateContentConfig(
             response_mime_type="application/json",
-            thinking_config = types.ThinkingConfig(
-            thinking_budget=1000,
-            ),
-            response_schema=genai.types.Schema(
-                type=genai.types.Type.OBJECT,
-                required=["summary", "parade_planner", "nasa_fun_fact"],
-                properties={
-                    "summary": genai.types.Schema(type=genai.types.Type.STRING),
-                    "parade_planner": genai.types.Schema(
-                        type=genai.types.Type.OBJECT,
-                        required=["overall_outlook", "clothing_recommendation", "contingency_plan"],
-                        properties={
-                            "overall_outlook": genai.types.Schema(type=genai.types.Type.STRING),
-                            "clothing_recommendation": genai.types.Schema(type=genai.types.Type.STRING),
-                            "contingency_plan": genai.types.Schema(type=genai.types.Type.STRING),
-                        },
-                    ),
-                    "nasa_fun_fact": genai.types.Schema(type=genai.types.Type.STRING),
-                },
-                
-            ),
-            # This system instruction is crucial for guiding the model
-            system_instruction=[
-                types.Part.from_text(text="""
-                You are an expert meteorologist and AI assistant for a NASA Space Apps project called \"Will It Rain On My Parade?\".
-                Your task is to analyze the following historical weather data for a specific location and time of year.
-                Provide a user-friendly summary and actionable recommendations for someone planning an outdoor event like a parade, hike, or vacation.
-                1.  Start with a friendly, conversational summary of what the weather is typically like.
-                2.  Provide a "Parade Planner" section with clear, actionable recommendations.
-                3.  Generate a "NASA Fun Fact" related to weather, climate, or Earth observation.
-                4.  Your entire response **MUST** be in a valid JSON format. Do not include any text before or after the JSON object.
-
-                **Required JSON Format:**
-                {{
-                "summary": "A concise, conversational summary of the typical weather conditions.",
-                "parade_planner": {{
-                    "overall_outlook": "A rating like 'Good', 'Fair with caution', or 'Challenging'.",
-                    "clothing_recommendation": "Specific advice on what to wear (e.g., light layers, sunscreen, hat).",
-                    "contingency_plan": "Advice on what to prepare for (e.g., have a backup indoor location, bring umbrellas)."
-                }},
-                "nasa_fun_fact": "An interesting fact related to NASA's Earth observation or weather satellites."
-                }}
-                """)
-            ],
-        )
-
-        # Use the regular generate_content for non-streaming, as it's simpler
-        # The API handles assembling the JSON for you.
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=generate_content_config,
+            response_schema=EVENT_INSIGHTS_SCHEMA,
+            thinking_config=types.ThinkingConfig(thinking_budget=settings.LLM_THINKING_BUDGET),
+            system_instruction=[types.Part.from_text(text=EVENT_INSIGHTS_SYSTEM_PROMPT)],
         )
 
-        # The response.text will contain the complete JSON string
+        with metrics.stage('llm'):
+            response = get_genai_client().models.generate_content(
+                model=settings.LLM_MODEL,
+                contents=contents,
+                config=generate_content_config,
+            )
         json_string = response.text
-        
-        # Parse the JSON string into a Python dictionary
         return json.loads(json_string)
 
     except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from API: {e}")
+        logger.error(f"Error decoding JSON from API: {e}")
         return {"error": "Failed to parse JSON response from the model.", "raw_response": json_string}
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        logger.error(f"An unexpected error occurred: {e}")
         return {"error": "An unexpected error occurred while generating the content."}
 
 
+def get_weather_analysis_json(weather_data: dict) -> dict:
+    """
+    Returns the weather analysis part (summary, parade planner, fun fact) of the
+    combined event insights.
 
-def what_to_wear(temp, cond, humi, wind, loc):
-    client = genai.Client(
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-
-    model = "gemini-2.5-flash"
-    contents = [
-        types.Content(
-            role="user",
-            parts=[
-                types.Part.from_text(text=f"""data (temperature: {temp}, condition: {cond}, humidity: {humi}, wind: {wind}, location: {loc})"""),
-            ],
-        ),
-    ]
-    generate_content_config = types.GenerateContentConfig(
-        thinking_config = types.ThinkingConfig(
-            thinking_budget=0,
-        ),
-        system_instruction=[
-            types.Part.from_text(text="""You are a smart outfit assistant. Based on the given weather data (temperature, condition, humidity, wind, and location), suggest what to wear.  
-Give a short, practical outfit recommendation with accessories or advice (e.g., bring an umbrella). the response contain no special chars like @,#,$,%,^,&,*,!,~ 
-Be friendly and concise."""),
-        ],
-    )
+    Args:
+        weather_data: A dictionary containing weather information.
 
-    response = client.models.generate_content(
-        model=model,
-        contents=contents,
-        config=generate_content_config,
-    )
-    return response.text
+    Returns:
+        A dictionary with the structured weather analysis,
+        or an error dictionary if something goes wrong.
+    """
+    insights = get_event_insights(weather_data)
+    if "error" in insights:
+        return insights
+    return {key: insights[key] for key in ("summary", "parade_planner", "nasa_fun_fact")}
 
 
+def what_to_wear(temp, cond, humi, wind, loc):
+    """
+    Returns an outfit recommendation for the given weather, or None if it could not
+    be generated. It is a section of the combined `get_event_insights` answer.
+    """
+    insights = get_event_insights({
+        "location": loc,
+        "condition": cond,
+        "temp_c": temp,
+        "humidity_percent": humi,
+        "wind_speed_kmh": wind,
+    })
+    return insights.get("what_to_wear")
 
 
 def activity_planner(temp, cond, humi, wind, loc, rain_chance, event_type):
-    client = genai.Client(
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-
-    model = "gemini-2.5-flash"
-    contents = [
-        types.Content(
-            role="user",
-            parts=[
-                types.Part.from_text(text=f"""data (temperature: {temp}, condition: {cond}, humidity: {humi}, wind: {wind}, location: {loc}), rain_chance: {rain_chance}), event_type: {event_type}"""),
-            ],
-        ),
-    ]
-    generate_content_config = types.GenerateContentConfig(
-        thinking_config = types.ThinkingConfig(
-            thinking_budget=0,
-        ),
-        system_instruction=[
-            types.Part.from_text(text="""You are an activity planner assistant. Given weather data (rain chance, temperature, wind, etc.), propose whether the outdoor activity should proceed, suggest backup plans, and warn about rain. Be brief and clear. the response contain no special chars like @,#,$,%,^,&,*,!,~"""),
-        ],
-    )
-
-    response = client.models.generate_content(
-        model=model,
-        contents=contents,
-        config=generate_content_config,
-    )
-    return response.text
-
-
-
-
-
-print(activity_planner(20, "partly cloudy", 80, 10, "New York City, USA", 50, "parade"))
-
-
-
-
-
-
-
-
-
-
-
-
-
+    """
+    Returns advice on whether an outdoor activity should go ahead, or None if it could
+    not be generated. It is a section of the combined `get_event_insights` answer.
+    """
+    insights = get_event_insights({
+        "location": loc,
+        "event_type": event_type,
+        "condition": cond,
+        "temp_c": temp,
+        "chance_of_rain_percent": rain_chance,
+        "humidity_percent": humi,
+        "wind_speed_kmh": wind,
+    })
+    return insights.get("activity_recommendation")
 
 
 def generate_weather_insights(weather_data: dict):
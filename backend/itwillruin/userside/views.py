@@ -9,38 +9,109 @@ This file implements modern, asynchronous views to provide a responsive user exp
 import json
 import asyncio
 import logging
+from collections import defaultdict
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, HttpResponse, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.cache import cache_page
+from django.views.decorators.csrf import csrf_protect
 from asgiref.sync import sync_to_async
 from datetime import datetime
 
 # It's good practice to import from your app's modules.
 # We assume the new weather model is in 'weather_model.py'.
-from .weather_model import get_weather_prediction_for_day
-from .utils import get_city_from_latlon, get_weather_analysis_json, what_to_wear, activity_planner
+from .weather_model import FORECAST_ENGINES, get_weather_prediction_for_day
+from .data_store import snap_to_grid
+from .forecast_history import get_recent_forecast, reusable_insights, save_forecast
+from .metrics import render as render_metrics, timed_view
+from .reports import ReportDataError, build_report_data, is_report_id, report_path, report_status, submit_report
+from .utils import get_city_from_latlon, get_event_insights
 
 # A single logger for the views module is a good practice.
 logger = logging.getLogger(__name__)
 
 # --- Static Page Views ---
 
+# These pages only render templates, so whole responses are cached for PAGE_CACHE_SECONDS.
+
+@cache_page(settings.PAGE_CACHE_SECONDS)
 def home_view(request):
     """Renders the home page."""
     return render(request, 'index.html')
 
+@cache_page(settings.PAGE_CACHE_SECONDS)
+@csrf_protect
 def map_view(request):
-    """Renders the prediction page with the map."""
+    """
+    Renders the prediction page with the map.
+    Its form holds a CSRF token: csrf_protect sets the token cookie and a
+    'Vary: Cookie' header before caching, so each visitor gets their own copy.
+    """
     return render(request, 'map.html')
 
 def insights_view(request):
     """Renders the AI insights page."""
     return render(request, 'insights.html')
 
+@cache_page(settings.PAGE_CACHE_SECONDS)
 def about_view(request):
     """Renders the about page."""
     return render(request, 'about.html')
 
 
+# Shown on the dashboard when an AI section is not available in time.
+WHAT_TO_WEAR_FALLBACK = "Outfit advice is not available right now. Check the temperature and rain chance above and dress in layers."
+ACTIVITY_PLANNER_FALLBACK = "Activity advice is not available right now. Use the forecast above and keep a backup plan in case of rain."
+
+
+def build_ai_prompt_data(weather_data, location_name, date_str, event_type=None):
+    """Collects the forecast fields sent to Gemini for the event insights."""
+    main_overview = weather_data.get('main_overview', {})
+    detailed_metrics = weather_data.get('detailed_metrics', {})
+    return {
+        "location": location_name,
+        "date": date_str,
+        "event_type": event_type or "outdoor event",
+        "condition": main_overview.get('condition'),
+        "temp_c": main_overview.get('temp'),
+        "high_temp_c": main_overview.get('high_temp'),
+        "low_temp_c": main_overview.get('low_temp'),
+        "feels_like_c": main_overview.get('feels_like'),
+        "chance_of_rain_percent": main_overview.get('rain_chance'),
+        "precipitation_mm": detailed_metrics.get('precipitation_mm'),
+        "humidity_percent": detailed_metrics.get('humidity_percent'),
+        "wind_speed_kmh": detailed_metrics.get('wind_speed_kmh'),
+        "uv_index": detailed_metrics.get('uv_index'),
+    }
+
+
+async def _with_deadline(awaitable, timeout, fallback, label):
+    """
+    Awaits `awaitable` for at most `timeout` seconds. If it times out or fails,
+    the error is logged and `fallback` is returned instead.
+    """
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"{label} did not finish within {timeout}s; using fallback.")
+    except Exception as e:
+        logger.warning(f"{label} failed: {e}; using fallback.")
+    return fallback
+
+
+async def _city_with_deadline(lat, lon):
+    """
+    Geocodes a point within DASHBOARD_GEOCODE_TIMEOUT, or returns 'Unknown'. The lookup
+    is only created once this coroutine runs, so a task for it that is cancelled
+    before it starts leaves no coroutine behind unawaited.
+    """
+    return await _with_deadline(
+        get_city_from_latlon(lat, lon), settings.DASHBOARD_GEOCODE_TIMEOUT, 'Unknown', 'Geocoding')
+
+
+@timed_view
 async def dashboard_view(request):
     """
     Renders the main dashboard.
@@ -57,25 +128,41 @@ async def dashboard_view(request):
         lon = request.POST.get('lon')
         date_str = request.POST.get('date')
         event_type = request.POST.get('event_type')
+        engine = request.POST.get('engine') or None
         if not all([lat, lon, date_str]):
             # Handle missing data gracefully
             return render(request, 'nodata.html', {'error': 'Latitude, longitude, and date are required.'})
 
-        # The view is now async, so we can correctly 'await' the coroutine.
-        # This resolves the RuntimeWarning.
-        data = await get_weather_prediction_for_day(lat, lon, date_str)
-        print("#####################################")
-        print(data['main_overview']['feels_like'])
-        print("#####################################")
-        print(data['main_overview']['temp'])
-        # Use sync_to_async for synchronous functions to avoid blocking the event loop.
-        city = await sync_to_async(get_city_from_latlon)(lat, lon)
-        
+        # Geocoding only needs the coordinates, so it runs while the forecast is computed.
+        city_task = asyncio.create_task(_city_with_deadline(lat, lon))
+        try:
+            # A fresh stored result for the same grid cell, date and event skips the whole pipeline.
+            cached = await get_recent_forecast(lat, lon, date_str, event_type, engine)
+            data = cached.forecast_prediction if cached else await get_weather_prediction_for_day(lat, lon, date_str, engine)
+        except Exception:
+            city_task.cancel()
+            raise
+        city = await city_task
+
         # Format date for display
         date_obj = datetime.strptime(date_str, "%Y-%m-%d")
         formatted_date = date_obj.strftime("%B %d, %Y")
-        _what_to_wear = what_to_wear(data['main_overview']['temp'], data['main_overview']['condition'], data['detailed_metrics']['humidity_percent'], data['detailed_metrics']['wind_speed_kmh'], city)
-        _activity_planner = activity_planner(data['main_overview']['temp'], data['main_overview']['condition'], data['detailed_metrics']['humidity_percent'], data['detailed_metrics']['wind_speed_kmh'], city, data['main_overview']['rain_chance'], event_type)
+
+        # Stored insights name the place they were written for, so they are only reused for the same place.
+        insights = reusable_insights(cached, city)
+        if cached and insights is None:
+            insights = reusable_insights(
+                await get_recent_forecast(lat, lon, date_str, event_type, engine, location_name=city), city)
+        if insights is None:
+            # All AI sections come from one structured Gemini call. It is blocking, so it runs
+            # in a worker thread with a deadline; each section falls back to a default text.
+            ai_prompt_data = build_ai_prompt_data(data, city, date_str, event_type)
+            insights = await _with_deadline(
+                sync_to_async(get_event_insights, thread_sensitive=False)(ai_prompt_data),
+                settings.DASHBOARD_LLM_TIMEOUT, {}, 'Event insights')
+            await save_forecast(lat, lon, date_str, event_type, engine, data, insights, city)
+        _what_to_wear = insights.get('what_to_wear') or WHAT_TO_WEAR_FALLBACK
+        _activity_planner = insights.get('activity_recommendation') or ACTIVITY_PLANNER_FALLBACK
 
         context = {
             'date': formatted_date,
@@ -98,61 +185,99 @@ async def dashboard_view(request):
 
 # --- Asynchronous API View ---
 
-async def weather_forecast_api(request):
-    """
-    An asynchronous API endpoint to fetch and process weather forecast data.
-    This is called by the JavaScript on the prediction and dashboard pages.
+def _parse_forecast_request(request, view_name):
     """
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+    Validates the JSON body shared by the forecast API endpoints.
 
+    Returns:
+        A tuple of (params, None) on success, or (None, HttpResponseBadRequest).
+    """
     try:
         # Best practice for APIs is to receive JSON data in the request body.
         data = json.loads(request.body)
         lat_str = data.get('latitude')
         lon_str = data.get('longitude')
         date_str = data.get('date')
+        end_date_str = data.get('end_date')
+        engine = data.get('engine')
 
         # Validate input parameters
         if not all([lat_str, lon_str, date_str]):
-            return HttpResponseBadRequest('Missing required parameters: latitude, longitude, date.')
-        
+            return None, HttpResponseBadRequest('Missing required parameters: latitude, longitude, date.')
+        if engine is not None and engine not in FORECAST_ENGINES:
+            return None, HttpResponseBadRequest(f"Unknown engine. Choose one of: {', '.join(FORECAST_ENGINES)}.")
+
         lat = float(lat_str)
         lon = float(lon_str)
         # Check date format
-        datetime.strptime(date_str, '%Y-%m-%d')
+        start_date = datetime.strptime(date_str, '%Y-%m-%d')
+        if end_date_str:
+            # An optional end date turns the request into a daily range from 'date' to 'end_date'.
+            range_days = (datetime.strptime(end_date_str, '%Y-%m-%d') - start_date).days
+            if not 0 <= range_days <= settings.FORECAST_MAX_RANGE_DAYS:
+                return None, HttpResponseBadRequest(f'end_date must be on or after date and at most {settings.FORECAST_MAX_RANGE_DAYS} days later.')
 
-    except (json.JSONDecodeError, TypeError, ValueError) as e:
-        logger.warning(f"Invalid input for weather_forecast_api: {e}")
-        return HttpResponseBadRequest('Invalid input format. Latitude/Longitude must be numbers and date must be YYYY-MM-DD.')
+    except (json.JSONDecodeError, TypeError, ValueError, AttributeError) as e:
+        logger.warning(f"Invalid input for {view_name}: {e}")
+        return None, HttpResponseBadRequest('Invalid input format. Latitude/Longitude must be numbers and date must be YYYY-MM-DD.')
+
+    return {
+        'lat': lat,
+        'lon': lon,
+        'date': date_str,
+        'end_date': end_date_str,
+        'event_type': data.get('event_type'),
+        'engine': engine,
+    }, None
+
+
+@timed_view
+async def weather_forecast_api(request):
+    """
+    An asynchronous API endpoint to fetch and process weather forecast data.
+    This is called by the JavaScript on the prediction and dashboard pages.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    params, error_response = _parse_forecast_request(request, 'weather_forecast_api')
+    if error_response is not None:
+        return error_response
+    lat, lon, date_str = params['lat'], params['lon'], params['date']
+    end_date_str, event_type, engine = params['end_date'], params['event_type'], params['engine']
 
     try:
-        # 1. Await the primary weather data forecast from the model.
-        logger.info(f"Fetching weather prediction for {lat}, {lon} on {date_str}")
-        weather_data = await get_weather_prediction_for_day(lat, lon, date_str)
-
-        # 2. Prepare a richer dataset for the AI analysis call.
-        location_name = await sync_to_async(get_city_from_latlon)(lat, lon)
-        
-        main_overview = weather_data.get('main_overview', {})
-        detailed_metrics = weather_data.get('detailed_metrics', {})
-        ai_prompt_data = {
-            "location": location_name,
-            "date": date_str,
-            "condition": main_overview.get('condition'),
-            "high_temp_c": main_overview.get('high_temp'),
-            "low_temp_c": main_overview.get('low_temp'),
-            "feels_like_c": main_overview.get('feels_like'),
-            "chance_of_rain_percent": main_overview.get('rain_chance'),
-            "precipitation_mm": detailed_metrics.get('precipitation_mm'),
-            "humidity_percent": detailed_metrics.get('humidity_percent'),
-            "wind_speed_kmh": detailed_metrics.get('wind_speed_kmh'),
-            "uv_index": detailed_metrics.get('uv_index'),
-        }
-        
-        # 3. Await the AI insights using the richer data.
-        logger.info("Fetching AI analysis.")
-        ai_insights = await sync_to_async(get_weather_analysis_json)(ai_prompt_data)
+        # Geocoding only needs the coordinates, so it runs while the forecast is loaded.
+        location_task = asyncio.create_task(_city_with_deadline(lat, lon))
+        try:
+            # 0. A fresh stored result for the same grid cell, date and event skips the whole pipeline.
+            # Date-range requests always go through the model, which caches its forecast paths.
+            cached = None if end_date_str else await get_recent_forecast(lat, lon, date_str, event_type, engine)
+            if cached:
+                weather_data = cached.forecast_prediction
+            else:
+                # 1. Await the primary weather data forecast from the model.
+                logger.info(f"Fetching weather prediction for {lat}, {lon} on {date_str}")
+                weather_data = await get_weather_prediction_for_day(lat, lon, date_str, engine, end_date_str)
+        except Exception:
+            location_task.cancel()
+            raise
+        location_name = await location_task
+
+        # Stored insights name the place they were written for, so they are only reused for the same place.
+        ai_insights = reusable_insights(cached, location_name)
+        if cached and ai_insights is None:
+            ai_insights = reusable_insights(await get_recent_forecast(
+                lat, lon, date_str, event_type, engine, location_name=location_name), location_name)
+        if ai_insights is None:
+            # 2. Prepare a richer dataset for the AI analysis call.
+            ai_prompt_data = build_ai_prompt_data(weather_data, location_name, date_str, event_type)
+
+            # 3. Await the AI insights using the richer data.
+            logger.info("Fetching AI analysis.")
+            ai_insights = await sync_to_async(get_event_insights, thread_sensitive=False)(ai_prompt_data)
+            if not end_date_str:
+                await save_forecast(lat, lon, date_str, event_type, engine, weather_data, ai_insights, location_name)
 
         # 4. Combine all results into the final JSON response.
         full_response = {
@@ -167,3 +292,198 @@ async def weather_forecast_api(request):
         logger.error(f"Error in weather_forecast_api: {e}", exc_info=True)
         return JsonResponse({'error': 'An error occurred while processing your request.'}, status=500)
 
+
+
+async def weather_forecast_batch_api(request):
+    """
+    Forecasts many events in one request.
+
+    Expects a JSON body like {"items": [{"latitude", "longitude", "date", "event_type"}, ...],
+    "engine": optional}. Items are grouped by NASA POWER grid cell: each cell's history is
+    loaded and its model fitted once, for the furthest requested date, and every other date
+    in that cell is answered from the same forecast path. At most FORECAST_BATCH_CONCURRENCY
+    items are processed at a time. Results are keyed by the index of the input item.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        items = data.get('items')
+        engine = data.get('engine')
+    except (json.JSONDecodeError, AttributeError) as e:
+        logger.warning(f"Invalid input for weather_forecast_batch_api: {e}")
+        return HttpResponseBadRequest('Invalid JSON body.')
+    if not isinstance(items, list) or not items:
+        return HttpResponseBadRequest('Missing required parameter: items.')
+    if len(items) > settings.FORECAST_BATCH_MAX_ITEMS:
+        return HttpResponseBadRequest(f'At most {settings.FORECAST_BATCH_MAX_ITEMS} items can be sent in one request.')
+    if engine is not None and engine not in FORECAST_ENGINES:
+        return HttpResponseBadRequest(f"Unknown engine. Choose one of: {', '.join(FORECAST_ENGINES)}.")
+
+    results = {}
+    cells = defaultdict(list)
+    for index, item in enumerate(items):
+        try:
+            lat, lon = float(item['latitude']), float(item['longitude'])
+            date_str = item['date']
+            datetime.strptime(date_str, '%Y-%m-%d')
+        except (KeyError, TypeError, ValueError):
+            results[index] = {'error': 'Latitude/Longitude must be numbers and date must be YYYY-MM-DD.'}
+            continue
+        cells[snap_to_grid(lat, lon)].append((index, lat, lon, date_str, item.get('event_type')))
+
+    semaphore = asyncio.Semaphore(settings.FORECAST_BATCH_CONCURRENCY)
+
+    async def forecast_item(index, lat, lon, date_str, event_type):
+        async with semaphore:
+            try:
+                weather_data = await get_weather_prediction_for_day(lat, lon, date_str, engine)
+                results[index] = {'weather_data': weather_data, 'request_date': date_str, 'event_type': event_type}
+            except Exception as e:
+                logger.error(f"Error in weather_forecast_batch_api for item {index}: {e}", exc_info=True)
+                results[index] = {'error': 'An error occurred while processing this item.'}
+
+    async def forecast_cell(cell_items):
+        # The furthest date goes first, so its forecast path covers every other date in the cell.
+        cell_items.sort(key=lambda cell_item: cell_item[3], reverse=True)
+        await forecast_item(*cell_items[0])
+        await asyncio.gather(*(forecast_item(*cell_item) for cell_item in cell_items[1:]))
+
+    await asyncio.gather(*(forecast_cell(cell_items) for cell_items in cells.values()))
+
+    return JsonResponse({'results': {str(index): results[index] for index in sorted(results)}})
+
+async def weather_forecast_stream_api(request):
+    """
+    Streaming variant of `weather_forecast_api`.
+
+    Takes the same JSON body, but answers with newline-delimited JSON and sends each
+    section as soon as it is ready. The 'forecast' section (overview, metrics, hourly
+    chart) comes first, followed by 'historical_comparison', 'location' and 'ai_insights'.
+    The stream ends with a 'done' line, or an 'error' line if the forecast fails.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    params, error_response = _parse_forecast_request(request, 'weather_forecast_stream_api')
+    if error_response is not None:
+        return error_response
+    lat, lon, date_str = params['lat'], params['lon'], params['date']
+
+    def line(section, data=None, **extra):
+        return json.dumps({'section': section, 'data': data, **extra}, cls=DjangoJSONEncoder) + '\n'
+
+    async def sections():
+        # Geocoding only needs the coordinates, so it runs while the forecast is computed.
+        location_task = asyncio.create_task(_city_with_deadline(lat, lon))
+        try:
+            weather_data = await get_weather_prediction_for_day(lat, lon, date_str, params['engine'], params['end_date'])
+        except Exception as e:
+            location_task.cancel()
+            logger.error(f"Error in weather_forecast_stream_api: {e}", exc_info=True)
+            yield line('error', error='An error occurred while processing your request.')
+            return
+
+        historical_comparison = weather_data.pop('historical_comparison_chart', None)
+        yield line('forecast', weather_data, request_date=date_str)
+        yield line('historical_comparison', historical_comparison)
+
+        location_name = await location_task
+        yield line('location', location_name)
+
+        ai_prompt_data = build_ai_prompt_data(weather_data, location_name, date_str, params['event_type'])
+        ai_insights = await _with_deadline(
+            sync_to_async(get_event_insights, thread_sensitive=False)(ai_prompt_data),
+            settings.DASHBOARD_LLM_TIMEOUT, {'error': 'AI insights are not available right now.'}, 'Event insights')
+        yield line('ai_insights', ai_insights)
+        yield line('done')
+
+    response = StreamingHttpResponse(sections(), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    # Ask reverse proxies not to buffer the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# --- PDF Reports ---
+
+def _report_response(report_id, status):
+    return {
+        'report_id': report_id,
+        'status': status,
+        'status_url': reverse('userside:report_status_api', args=[report_id]),
+        'download_url': reverse('userside:report_download', args=[report_id]),
+    }
+
+
+async def report_api(request):
+    """
+    Queues a PDF report with the forecast and AI insights for an event.
+
+    Takes the same JSON body as `weather_forecast_api` and answers with the report id,
+    its status and the URLs to poll and download it (202 while it is being rendered).
+    The PDF is rendered in the report worker pool. A request for a forecast that has
+    already been rendered gets the existing report straight away.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    params, error_response = _parse_forecast_request(request, 'report_api')
+    if error_response is not None:
+        return error_response
+    lat, lon, date_str = params['lat'], params['lon'], params['date']
+
+    try:
+        # A one-day range gives the expected range of every metric for the report table.
+        weather_data = await get_weather_prediction_for_day(lat, lon, date_str, params['engine'], date_str)
+        location_name = await _city_with_deadline(lat, lon)
+        ai_prompt_data = build_ai_prompt_data(weather_data, location_name, date_str, params['event_type'])
+        ai_insights = await _with_deadline(
+            sync_to_async(get_event_insights, thread_sensitive=False)(ai_prompt_data),
+            settings.DASHBOARD_LLM_TIMEOUT, {}, 'Event insights')
+        if 'error' in ai_insights:
+            ai_insights = {}
+
+        report_data = build_report_data(weather_data, ai_insights, location_name, date_str)
+        report_id, status = submit_report(report_data)
+    except ReportDataError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error in report_api: {e}", exc_info=True)
+        return JsonResponse({'error': 'An error occurred while processing your request.'}, status=500)
+
+    return JsonResponse(_report_response(report_id, status), status=200 if status == 'ready' else 202)
+
+
+def report_status_api(request, report_id):
+    """Returns the status of a report: 'ready', 'pending' or 'failed'."""
+    status = report_status(report_id) if is_report_id(report_id) else 'unknown'
+    if status == 'unknown':
+        return JsonResponse({'error': 'Unknown report.'}, status=404)
+    return JsonResponse(_report_response(report_id, status))
+
+
+def report_download_view(request, report_id):
+    """Serves a rendered report PDF. Answers 202 while it is still being rendered."""
+    status = report_status(report_id) if is_report_id(report_id) else 'unknown'
+    if status == 'ready':
+        try:
+            report = open(report_path(report_id), 'rb')
+        except FileNotFoundError:
+            # Evicted since the status check.
+            return JsonResponse({'error': 'Unknown report.'}, status=404)
+        return FileResponse(report, content_type='application/pdf',
+                            as_attachment=True, filename=f"weather-report-{report_id[:12]}.pdf")
+    if status == 'pending':
+        return JsonResponse(_report_response(report_id, status), status=202)
+    if status == 'failed':
+        return JsonResponse({'error': 'The report could not be rendered.'}, status=500)
+    return JsonResponse({'error': 'Unknown report.'}, status=404)
+
+
+# --- Metrics ---
+
+def metrics_view(request):
+    """Serves latency histograms and cache counters in the Prometheus text format."""
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
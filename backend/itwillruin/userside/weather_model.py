@@ -9,41 +9,218 @@ FIXES APPLIED:
 - Added `asfreq('D')` to time-series data to explicitly set the frequency, removing the ValueWarning.
 - Increased `maxiter` in the model fitting and added a warning filter to handle the ConvergenceWarning gracefully.
 """
-import requests
+import httpx
 import pandas as pd
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 from datetime import datetime, timedelta
 import numpy as np
 import asyncio
+import copy
+import logging
+import multiprocessing
+import os
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
 from statsmodels.tools.sm_exceptions import ConvergenceWarning
 
+from . import climatology, data_store, http_client, imerg, metrics, model_cache, region_store, seed_store
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests for the same grid cell share one download, one fit and one result.
+_history_flight = SingleFlight()
+_path_flight = SingleFlight()
+_prediction_flight = SingleFlight()
+
 # --- 1. NASA POWER API Data Fetching ---
 
-async def fetch_historical_daily_data(lat, lon, start_date="20200101"):
+POWER_PARAMETERS = "T2M_MAX,T2M_MIN,T2M,PRECTOTCORR,WS10M,RH2M,ALLSKY_SFC_UVA"
+
+
+class PowerApiError(Exception):
+    """Raised when NASA POWER cannot be reached or answers with an error."""
+
+
+async def fetch_power_daily_range(lat, lon, start_date, end_date, parameters=POWER_PARAMETERS):
     """
-    Fetches historical daily weather data from NASA POWER API.
-    This data is used to train the time-series forecasting models.
+    Downloads daily data for [start_date, end_date] (YYYYMMDD) from the NASA POWER API.
+    Missing values (-999) are returned as NaN.
     """
-    params = "T2M_MAX,T2M_MIN,T2M,PRECTOTCORR,WS10M,RH2M,ALLSKY_SFC_UVA"
-    end_date = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
-    
-    url = f"https://power.larc.nasa.gov/api/temporal/daily/point?parameters={params}&start={start_date}&end={end_date}&latitude={lat}&longitude={lon}&community=AG&format=JSON"
-    
-    loop = asyncio.get_event_loop()
-    response = await loop.run_in_executor(None, requests.get, url)
-    if response.status_code != 200:
-        raise Exception("Failed to fetch data from NASA POWER API.")
-    r = response.json()
+    params = {
+        'parameters': parameters,
+        'start': start_date,
+        'end': end_date,
+        'latitude': lat,
+        'longitude': lon,
+        'community': 'AG',
+        'format': 'JSON',
+    }
+    try:
+        with metrics.stage('nasa_power'):
+            r = await http_client.get_json(settings.POWER_DAILY_POINT_URL, params=params)
+    except httpx.HTTPError as e:
+        raise PowerApiError("Failed to fetch data from NASA POWER API.") from e
+
+    return power_json_to_dataframe(r)
 
-    df_data = r['properties']['parameter']
+def power_json_to_dataframe(response):
+    """
+    Converts a NASA POWER daily point response into a DataFrame indexed by date.
+    """
+    df_data = response['properties']['parameter']
     df = pd.DataFrame(df_data)
     df.index = pd.to_datetime(df.index, format='%Y%m%d')
     df.replace(-999, np.nan, inplace=True)
+
+    return df
+
+async def ingest_region(name, min_lat, min_lon, max_lat, max_lon, start_date="20200101"):
+    """
+    Downloads the daily history of every grid cell inside a bounding box into a
+    region cube (see `region_store`), tile by tile with one point request per cell.
+    If the cube already exists for the same box, complete cells only request the
+    days after its last stored date. Cells that failed or are incomplete are
+    downloaded again from the start.
+
+    Returns:
+        A tuple of (number of cells, list of (lat, lon) cells that failed to download).
+    """
+    lats, lons = region_store.grid_points(min_lat, min_lon, max_lat, max_lon)
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp((datetime.now() - timedelta(days=1)).date())
+
+    cells = [(float(lat), float(lon)) for lat in lats for lon in lons]
+    cell_starts = dict.fromkeys(cells, start)
+    existing = region_store.load_cube(name)
+    if (existing is not None and np.array_equal(existing['lat'].values, lats)
+            and np.array_equal(existing['lon'].values, lons)):
+        existing = region_store.trim_trailing_gaps(existing.load())
+        start = min(start, pd.Timestamp(existing['time'].values[0]))
+        resume = pd.Timestamp(existing['time'].values[-1]) + timedelta(days=1)
+        complete = region_store.complete_cells(existing)
+        for i, lat in enumerate(lats):
+            for j, lon in enumerate(lons):
+                cell_starts[(float(lat), float(lon))] = resume if complete[i, j] else start
+    else:
+        existing = None
+
+    cells = [cell for cell in cells if cell_starts[cell] <= end]
+    # Concurrency is capped by the shared client's per-host limit.
+    results = await asyncio.gather(*(
+        fetch_power_daily_range(lat, lon, cell_starts[(lat, lon)].strftime('%Y%m%d'), end.strftime('%Y%m%d'))
+        for lat, lon in cells
+    ), return_exceptions=True)
+    frames = {cell: df for cell, df in zip(cells, results) if not isinstance(df, Exception)}
+    failed = [cell for cell, df in zip(cells, results) if isinstance(df, Exception)]
+
+    if frames:
+        cube = region_store.build_cube(lats, lons, frames, end)
+        if existing is not None:
+            # New values win; days a cell did not request again keep their stored values.
+            cube = region_store.trim_trailing_gaps(cube.combine_first(existing))
+            cube.attrs['fetched_through'] = end.strftime('%Y-%m-%d')
+        await asyncio.get_running_loop().run_in_executor(None, region_store.save_cube, name, cube)
+    return len(lats) * len(lons), failed
+
+async def fetch_historical_daily_data(lat, lon, start_date="20200101"):
+    """
+    Returns historical daily weather data for the NASA POWER grid cell containing a location.
+    This data is used to train the time-series forecasting models.
+
+    The series is kept in the local data store; only the days after the last
+    stored date are requested from NASA POWER, and nothing is requested at all
+    once the store has been updated through yesterday. Concurrent calls for the
+    same cell share one load and return the same DataFrame.
+
+    Cells inside an ingested region (see `ingest_region`) are read from the
+    region cube instead. A cell with an imported dataset (see `seed_store`) starts
+    from that dataset instead of a full download, and its whole series is
+    returned, however far back it goes. Parameters the dataset lacks are only
+    available for the period the models train on.
+    """
+    lat, lon = data_store.snap_to_grid(lat, lon)
+    with metrics.stage('history'):
+        return await _history_flight.do((lat, lon, start_date), _load_historical_daily_data, lat, lon, start_date)
+
+async def _load_historical_daily_data(lat, lon, start_date):
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp((datetime.now() - timedelta(days=1)).date())
+
+    loop = asyncio.get_event_loop()
+    stored, fetched_through = await loop.run_in_executor(None, data_store.load_history, lat, lon)
+    if stored is None:
+        stored, fetched_through = await loop.run_in_executor(None, region_store.load_point, lat, lon)
+    if stored is None:
+        stored, fetched_through = await _load_seeded_history(lat, lon, start, end)
+    if stored is not None and not stored.empty:
+        start = min(start, stored.index.min())
+    metrics.cache_result('history_store', stored is not None and fetched_through is not None and fetched_through >= end)
+
+    if stored is None or stored.empty:
+        df = await fetch_power_daily_range(lat, lon, start.strftime('%Y%m%d'), end.strftime('%Y%m%d'))
+        await loop.run_in_executor(None, data_store.save_history, lat, lon, df, end)
+    elif fetched_through is None:
+        # A seed whose missing parameters could not be downloaded: served as it is, not stored.
+        df = stored
+    elif fetched_through >= end:
+        df = stored
+    else:
+        fetch_start = stored.index.max() + timedelta(days=1)
+        df = stored
+        try:
+            if fetch_start <= end:
+                new_days = await fetch_power_daily_range(lat, lon, fetch_start.strftime('%Y%m%d'), end.strftime('%Y%m%d'))
+                df = pd.concat([stored, new_days])
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+        except PowerApiError as e:
+            # Offline: keep serving the stored series; the update is retried on the next call.
+            logger.warning(f"Could not update the history of {lat}, {lon}, using the stored data: {e}")
+        else:
+            await loop.run_in_executor(None, data_store.save_history, lat, lon, df, end)
+
+    df = data_store.trim_trailing_gaps(df.loc[start:]).copy()
     df.ffill(inplace=True)
-    
+
     return df
 
+async def _load_seeded_history(lat, lon, start, end):
+    """
+    Builds the initial history of a cell from its imported dataset, or returns
+    (None, None) if it has none. Parameters missing from the dataset are downloaded
+    in a single request for just those columns, limited to the days the models
+    train on (see `training_start`).
+
+    If that download fails, the dataset's own columns are returned with a
+    fetched-through date of None. They are not stored, so the download is tried
+    again on the next call.
+    """
+    loop = asyncio.get_event_loop()
+    seed = await loop.run_in_executor(None, seed_store.load_seed, lat, lon)
+    if seed is None:
+        return None, None
+
+    parameters = POWER_PARAMETERS.split(',')
+    missing = [param for param in parameters if param not in seed.columns]
+    df = seed.reindex(columns=parameters)
+    backfill_start = max(seed.index.min(), training_start(missing, start, end))
+    if missing and backfill_start <= seed.index.max():
+        try:
+            backfill = await fetch_power_daily_range(
+                lat, lon, backfill_start.strftime('%Y%m%d'), seed.index.max().strftime('%Y%m%d'),
+                parameters=','.join(missing))
+        except PowerApiError as e:
+            logger.warning(f"Could not download {', '.join(missing)} for the seeded history of {lat}, {lon}, "
+                           f"using the dataset's own columns: {e}")
+            return df, None
+        df[missing] = backfill[missing].reindex(df.index)
+
+    fetched_through = seed.index.max()
+    await loop.run_in_executor(None, data_store.save_history, lat, lon, df, fetched_through)
+    return df, fetched_through
+
 # --- 2. Helper Functions & Data Simulation ---
 
 def calculate_feels_like(temp, humidity):
@@ -55,20 +232,32 @@ def calculate_feels_like(temp, humidity):
     heat_index = -8.7847 + 1.6114 * temp + 2.3385 * humidity - 0.1461 * temp * humidity - 0.0123 * temp**2 - 0.0164 * humidity**2 + 0.0022 * temp**2 * humidity + 0.0007 * temp * humidity**2 - 0.0000036 * temp**2 * humidity**2
     return round(heat_index, 1)
 
-def get_historical_averages(daily_df, target_date):
+def get_historical_averages(climatology_table, target_date):
     """
-    Calculates the historical average high and low temperature for a specific day of the year.
+    Looks up the historical statistics for the day of year of target_date in a
+    location's climatology table (see `climatology.get_climatology`): average high and
+    low temperature, their 10th-90th percentile range and how often it rains.
     """
     day_of_year = target_date.dayofyear
-    historical_day_data = daily_df[daily_df.index.dayofyear == day_of_year]
-    
-    if historical_day_data.empty:
+    if day_of_year not in climatology_table.index:
+        return {'avg_high': None, 'avg_low': None}
+
+    row = climatology_table.loc[day_of_year]
+    if pd.isna(row[('T2M_MAX', 'mean')]):
         return {'avg_high': None, 'avg_low': None}
-        
-    avg_high = historical_day_data['T2M_MAX'].mean()
-    avg_low = historical_day_data['T2M_MIN'].mean()
-    
-    return {'avg_high': round(avg_high, 1), 'avg_low': round(avg_low, 1)}
+
+    rain_frequency = row.get(('PRECTOTCORR', 'rain_frequency'), np.nan)
+    # The table is stored as float32, which JSON encoders reject; round to plain floats.
+    def value(variable, statistic):
+        return round(float(row[(variable, statistic)]), 1)
+
+    return {
+        'avg_high': value('T2M_MAX', 'mean'),
+        'avg_low': value('T2M_MIN', 'mean'),
+        'high_range': [value('T2M_MAX', 'p10'), value('T2M_MAX', 'p90')],
+        'low_range': [value('T2M_MIN', 'p10'), value('T2M_MIN', 'p90')],
+        'rain_frequency_percent': None if pd.isna(rain_frequency) else int(round(rain_frequency * 100)),
+    }
 
 def simulate_hourly_forecast(daily_forecast):
     """
@@ -98,52 +287,357 @@ def simulate_hourly_forecast(daily_forecast):
 
 # --- 3. Time-Series Forecasting ---
 
-def forecast_daily_variable(series, steps=1):
+FORECAST_VARIABLES = ['T2M_MAX', 'T2M_MIN', 'T2M', 'PRECTOTCORR', 'RH2M', 'WS10M', 'ALLSKY_SFC_UVA']
+
+# 'auto' training window tiers: (longest horizon in days, window in days). Longer
+# horizons use AUTO_WINDOW_MAX_DAYS. Only a few fixed windows exist, so cached
+# parameters keep matching across nearby horizons instead of being refitted.
+AUTO_WINDOW_TIERS = ((30, 365), (90, 2 * 365))
+AUTO_WINDOW_MAX_DAYS = 3 * 365
+
+SEASONAL_TERMS = (None, 'deseasonalize')
+
+def training_window_days(variable, steps, window=None):
     """
-    Trains a SARIMAX model and forecasts a single variable for a number of days ahead.
+    Returns how many trailing days of history a variable is trained on when
+    forecasting `steps` days ahead, or None for all of it. `window` overrides
+    the FORECAST_TRAINING_WINDOW(S) settings; it can be a number of days, 'auto' or 'all'.
+    """
+    if window is None:
+        window = getattr(settings, 'FORECAST_TRAINING_WINDOWS', {}).get(
+            variable, getattr(settings, 'FORECAST_TRAINING_WINDOW', 'auto'))
+    if window == 'auto':
+        return next((days for max_steps, days in AUTO_WINDOW_TIERS if steps <= max_steps), AUTO_WINDOW_MAX_DAYS)
+    if window is None or window == 'all':
+        return None
+    return int(window)
+
+def training_options(variable, steps, window=None, seasonal_terms=False):
+    """
+    Returns the training keyword arguments of `forecast_daily_path` for a variable
+    and horizon, from the settings unless given.
+    """
+    if seasonal_terms is False:
+        seasonal_terms = getattr(settings, 'FORECAST_SEASONAL_TERMS', None)
+    return {'window': training_window_days(variable, steps, window), 'seasonal_terms': seasonal_terms}
+
+def training_settings():
+    """Returns the training settings, stored with cached forecast paths to detect changes."""
+    return {
+        'window': getattr(settings, 'FORECAST_TRAINING_WINDOW', 'auto'),
+        'windows': getattr(settings, 'FORECAST_TRAINING_WINDOWS', {}),
+        'seasonal_terms': getattr(settings, 'FORECAST_SEASONAL_TERMS', None),
+    }
+
+def training_start(variables, start, end):
+    """
+    Returns the first day of history that any forecast of `variables` trains on when
+    the history ends on `end`: the longest of their training windows, or `start`
+    if one of them is trained on all history.
     """
+    windows = [training_window_days(var, float('inf')) for var in variables]
+    if not windows or None in windows:
+        return start
+    return end - timedelta(days=max(windows) - 1)
+
+def seasonal_component(series, steps):
+    """
+    Fits the annual cycle (and trend) of a daily series over its whole history with
+    the harmonic regression, and returns it for the series' dates and `steps` days beyond.
+    """
+    t = (series.index - series.index[0]).days.to_numpy()
+    valid = series.notna().to_numpy()
+    coefficients, *_ = np.linalg.lstsq(harmonic_design_matrix(t[valid]), series.to_numpy()[valid], rcond=None)
+    all_t = np.concatenate([t, t[-1] + np.arange(1, steps + 1)])
+    index = series.index.append(pd.date_range(series.index[-1] + timedelta(days=1), periods=steps, freq='D'))
+    return pd.Series(harmonic_design_matrix(all_t) @ coefficients, index=index)
+
+def forecast_daily_path(series, steps=1, location=None, window=None, seasonal_terms=None):
+    """
+    Trains a SARIMAX model and forecasts a single variable for every day up to `steps` ahead.
+
+    The model is trained on the last `window` days of the series only (all of it if
+    None), so the fit does not slow down as the history grows. With seasonal_terms
+    'deseasonalize', the annual cycle is first fitted over the full history and
+    removed; the model forecasts the remaining anomaly and the cycle is added back.
+
+    When a location key is given, previously fitted parameters for that location,
+    variable and window are reused: while they are fresh and were fitted with the same
+    seasonal terms, the model only runs the Kalman filter over the series to take in
+    new observations. Otherwise the fit is warm-started from them.
+
+    Returns:
+        A DataFrame indexed by date with the 'mean', 'lower' and 'upper' (95% interval) forecast.
+    """
+    if seasonal_terms not in SEASONAL_TERMS:
+        raise ValueError(f"Unknown seasonal terms {seasonal_terms!r}; choose from {SEASONAL_TERMS}")
+    variable = series.name
+    training = {'window': window, 'seasonal_terms': seasonal_terms}
+
     # FIX: Explicitly set the frequency of the time series to 'D' (daily)
     # This removes the `ValueWarning`.
     series = series.asfreq('D')
+    seasonal = None
+    if seasonal_terms == 'deseasonalize':
+        seasonal = seasonal_component(series, steps)
+        series = (series - seasonal.reindex(series.index)).rename(variable)
+    if window:
+        series = series.iloc[-window:]
 
     model = SARIMAX(series, order=(1, 1, 1), seasonal_order=(1, 1, 1, 7),
                       enforce_stationarity=False, enforce_invertibility=False)
-    
+
+    cached = model_cache.load_params(location, variable, window) if location else None
+    if cached and list(cached['params']) != list(model.param_names):
+        cached = None
+
     # FIX: Use a context manager to suppress the ConvergenceWarning and increase iterations.
     with warnings.catch_warnings():
         warnings.filterwarnings("ignore", category=ConvergenceWarning)
-        # The model will try more times to find a good fit before giving up.
-        result = model.fit(disp=False, maxiter=200) 
-    
+        if cached and not model_cache.is_stale(cached) and cached.get('training') == training:
+            result = model.filter(pd.Series(cached['params'])[model.param_names].values)
+        else:
+            start_params = pd.Series(cached['params'])[model.param_names].values if cached else None
+            # The model will try more times to find a good fit before giving up.
+            result = model.fit(disp=False, maxiter=200, start_params=start_params)
+            if location:
+                model_cache.save_params(location, variable, pd.Series(result.params, index=model.param_names),
+                                        series.index.max(), training)
+
     forecast = result.get_forecast(steps=steps)
-    return forecast.predicted_mean.iloc[-1]
+    interval = forecast.conf_int(alpha=0.05)
+    index = forecast.predicted_mean.index
+    offset = seasonal.reindex(index).to_numpy() if seasonal is not None else 0
+    return pd.DataFrame({
+        'mean': forecast.predicted_mean.values + offset,
+        'lower': interval.iloc[:, 0].values + offset,
+        'upper': interval.iloc[:, 1].values + offset,
+    }, index=index)
+
+def _timed_forecast_daily_path(series, steps, location, training):
+    # Runs in a fit worker; the duration is sent back so the parent can record it.
+    started = time.perf_counter()
+    path = forecast_daily_path(series, steps, location, **training)
+    return path, time.perf_counter() - started
+
+def forecast_daily_variable(series, steps=1, location=None):
+    """
+    Trains a SARIMAX model and forecasts a single variable for a number of days ahead.
+    """
+    return forecast_daily_path(series, steps, location, **training_options(series.name, steps))['mean'].iloc[-1]
+
+_fit_executor = None
+
+def get_fit_executor():
+    """
+    Returns the process pool used to fit the per-variable models, creating it on first use.
+    Fits are CPU-bound, so running them in separate processes keeps the event loop free
+    and lets all variables be fitted in parallel.
+    """
+    global _fit_executor
+    if _fit_executor is None:
+        workers = getattr(settings, 'FORECAST_FIT_WORKERS', None) or min(len(FORECAST_VARIABLES), os.cpu_count() or 1)
+        # 'spawn' avoids forking a process that already runs server threads.
+        _fit_executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    return _fit_executor
+
+async def forecast_daily_variables(historical_df, steps, location=None):
+    """
+    Forecasts the path of every variable in FORECAST_VARIABLES concurrently in the fit
+    process pool, each with its configured training window.
+    Returns a DataFrame with (variable, statistic) columns.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_fit_executor()
+    # The options are resolved here, so the workers do not depend on their own copy of the settings.
+    results = await asyncio.gather(*(
+        loop.run_in_executor(executor, _timed_forecast_daily_path, historical_df[var], steps, location,
+                             training_options(var, steps))
+        for var in FORECAST_VARIABLES
+    ))
+    for var, (_, seconds) in zip(FORECAST_VARIABLES, results):
+        metrics.record_stage(f'fit.{var}', seconds)
+    return pd.concat({var: path for var, (path, _) in zip(FORECAST_VARIABLES, results)}, axis=1)
+
+# --- 3b. Harmonic Regression Forecasting ---
+
+FORECAST_ENGINES = ('sarimax', 'harmonic')
+
+def harmonic_design_matrix(t, annual_harmonics=3):
+    """
+    Builds the regression design matrix for day offsets `t`: an intercept, a linear
+    trend, `annual_harmonics` annual sine/cosine pairs and one weekly pair.
+    """
+    t = np.asarray(t, dtype=float)
+    columns = [np.ones_like(t), t / 365.25]
+    for k in range(1, annual_harmonics + 1):
+        angle = 2 * np.pi * k * t / 365.25
+        columns += [np.sin(angle), np.cos(angle)]
+    weekly = 2 * np.pi * t / 7
+    columns += [np.sin(weekly), np.cos(weekly)]
+    return np.column_stack(columns)
+
+def forecast_harmonic_path(historical_df, steps=1, variables=FORECAST_VARIABLES):
+    """
+    Forecasts all variables at once with a least-squares harmonic regression.
+    Every variable shares the same design matrix, so the whole fit is a single
+    batched `lstsq` call, which takes milliseconds instead of seconds.
+
+    Returns:
+        A DataFrame with (variable, statistic) columns like `forecast_daily_variables`,
+        with a 95% interval derived from the residual spread.
+    """
+    values = historical_df[variables].to_numpy(dtype=float)
+    t = (historical_df.index - historical_df.index[0]).days.to_numpy()
+    valid = ~np.isnan(values).any(axis=1)
+
+    design = harmonic_design_matrix(t[valid])
+    coefficients, *_ = np.linalg.lstsq(design, values[valid], rcond=None)
+    residual_std = (values[valid] - design @ coefficients).std(axis=0)
+
+    future_t = t[-1] + np.arange(1, steps + 1)
+    prediction = harmonic_design_matrix(future_t) @ coefficients
+    index = pd.date_range(historical_df.index[-1] + timedelta(days=1), periods=steps, freq='D')
+    return pd.concat({
+        var: pd.DataFrame({
+            'mean': prediction[:, i],
+            'lower': prediction[:, i] - 1.96 * residual_std[i],
+            'upper': prediction[:, i] + 1.96 * residual_std[i],
+        }, index=index)
+        for i, var in enumerate(variables)
+    }, axis=1)
+
+def forecast_harmonic(historical_df, steps=1, variables=FORECAST_VARIABLES):
+    """
+    Forecasts all variables for the day `steps` ahead with the harmonic regression.
+    """
+    path = forecast_harmonic_path(historical_df, steps, variables)
+    return {var: float(path[(var, 'mean')].iloc[-1]) for var in variables}
 
 # --- 4. Main Prediction Orchestrator ---
 
-async def get_weather_prediction_for_day(lat, lon, target_date_str):
+async def get_forecast_path(lat, lon, historical_df, steps, engine):
+    """
+    Returns the forecast path for a location covering at least `steps` days.
+
+    A path is computed for at least FORECAST_MIN_HORIZON_DAYS and cached, so every
+    later request for a date inside that horizon is answered without refitting, as
+    long as no new observations have arrived in the meantime.
+    """
+    location = data_store.location_key(lat, lon)
+    last_known_date = historical_df.index.max()
+
+    loop = asyncio.get_running_loop()
+    path = await loop.run_in_executor(None, model_cache.load_forecast_path,
+                                      location, engine, last_known_date, training_settings())
+    metrics.cache_result('forecast_path', path is not None and len(path) >= steps)
+    if path is not None and len(path) >= steps:
+        return path
+
+    horizon = max(steps, getattr(settings, 'FORECAST_MIN_HORIZON_DAYS', 14))
+    return await _path_flight.do(
+        (location, engine, horizon, last_known_date),
+        _compute_forecast_path, location, historical_df, horizon, engine,
+    )
+
+async def _compute_forecast_path(location, historical_df, horizon, engine):
+    loop = asyncio.get_running_loop()
+    if engine == 'harmonic':
+        with metrics.stage('fit.harmonic'):
+            path = await loop.run_in_executor(None, forecast_harmonic_path, historical_df, horizon)
+    else:
+        path = await forecast_daily_variables(historical_df, horizon, location)
+    await loop.run_in_executor(None, model_cache.save_forecast_path,
+                               location, engine, path, historical_df.index.max(), training_settings())
+    return path
+
+async def warm_location(lat, lon, engine=None, steps=1):
+    """
+    Brings the stored history of a location up to date and precomputes its forecast
+    path, so the next request for it is served from the caches.
+    """
+    engine = engine or getattr(settings, 'FORECAST_ENGINE', 'sarimax')
+    lat, lon = data_store.snap_to_grid(lat, lon)
+    historical_df = await fetch_historical_daily_data(lat, lon)
+    return await get_forecast_path(lat, lon, historical_df, steps, engine)
+
+def forecast_range_records(historical_df, path, start_date, end_date):
+    """
+    Lists the daily values of every variable from start_date to end_date. Observed days
+    come from the history and have no interval; later days come from the forecast path.
+    """
+    records = []
+    for day in pd.date_range(start_date, end_date, freq='D'):
+        if day in historical_df.index:
+            observed = historical_df.loc[day]
+            variables = {var: {'mean': round(float(observed[var]), 2), 'lower': None, 'upper': None}
+                         for var in FORECAST_VARIABLES}
+            records.append({'date': day.strftime('%Y-%m-%d'), 'observed': True, 'variables': variables})
+        elif path is not None and day in path.index:
+            row = path.loc[day]
+            variables = {var: {stat: round(float(row[(var, stat)]), 2) for stat in ('mean', 'lower', 'upper')}
+                         for var in FORECAST_VARIABLES}
+            records.append({'date': day.strftime('%Y-%m-%d'), 'observed': False, 'variables': variables})
+    return records
+
+async def get_weather_prediction_for_day(lat, lon, target_date_str, engine=None, range_end_str=None):
     """
     Main function to generate a complete weather forecast package for the dashboard.
+    `engine` selects the forecasting model ('sarimax' or 'harmonic'); it defaults to
+    the FORECAST_ENGINE setting. If `range_end_str` is given, the package also holds a
+    'forecast_range' with the daily values from the target date through that date.
     """
+    engine = engine or getattr(settings, 'FORECAST_ENGINE', 'sarimax')
+    if engine not in FORECAST_ENGINES:
+        raise ValueError(f"Unknown forecast engine: {engine}")
+
+    # Everything is computed per NASA POWER grid cell, and identical requests that
+    # arrive while one is already running wait for its result.
+    lat, lon = data_store.snap_to_grid(lat, lon)
+    dashboard_data = await _prediction_flight.do(
+        (lat, lon, target_date_str, engine, range_end_str),
+        _build_weather_prediction, lat, lon, target_date_str, engine, range_end_str,
+    )
+    return copy.deepcopy(dashboard_data)
+
+async def _build_weather_prediction(lat, lon, target_date_str, engine, range_end_str):
     target_date = pd.to_datetime(target_date_str)
-    
+    range_end = pd.to_datetime(range_end_str) if range_end_str else target_date
+
     historical_df = await fetch_historical_daily_data(lat, lon)
-    
+
     last_known_date = historical_df.index.max()
     days_to_forecast = (target_date.date() - last_known_date.date()).days
-    
+    days_to_range_end = (range_end.date() - last_known_date.date()).days
+
+    path = None
+    if days_to_range_end >= 1:
+        path = await get_forecast_path(lat, lon, historical_df, days_to_range_end, engine)
+
     daily_forecast = {}
     if days_to_forecast < 1:
         print(f"Target date {target_date_str} is in the past or today. Using historical data.")
         day_data = historical_df.loc[historical_df.index.date == target_date.date()].iloc[0]
         daily_forecast = day_data.to_dict()
     else:
-        variables_to_forecast = ['T2M_MAX', 'T2M_MIN', 'T2M', 'PRECTOTCORR', 'RH2M', 'WS10M', 'ALLSKY_SFC_UVA']
-        for var in variables_to_forecast:
-            daily_forecast[var] = forecast_daily_variable(historical_df[var], steps=days_to_forecast)
+        target_row = path.loc[target_date.normalize()]
+        daily_forecast = {var: float(target_row[(var, 'mean')]) for var in FORECAST_VARIABLES}
 
-    historical_averages = get_historical_averages(historical_df, target_date)
+    loop = asyncio.get_running_loop()
+    with metrics.stage('climatology'):
+        climatology_table = await loop.run_in_executor(None, climatology.get_climatology, lat, lon, historical_df)
+    historical_averages = get_historical_averages(climatology_table, target_date)
     feels_like_temp = calculate_feels_like(daily_forecast['T2M'], daily_forecast['RH2M'])
     rain_chance_percent = min(int(daily_forecast['PRECTOTCORR'] * 20), 100)
+
+    # Blend in how often it rained around this date in the higher-resolution IMERG record.
+    imerg_series = await loop.run_in_executor(None, imerg.load_cell_series, lat, lon)
+    imerg_frequency = imerg.rain_day_frequency(imerg_series, target_date) if imerg_series is not None else None
+    historical_averages['imerg_rain_frequency_percent'] = None
+    if imerg_frequency is not None:
+        historical_averages['imerg_rain_frequency_percent'] = int(round(imerg_frequency * 100))
+        weight = getattr(settings, 'IMERG_RAIN_CHANCE_WEIGHT', 0.5)
+        rain_chance_percent = int(round((1 - weight) * rain_chance_percent + weight * imerg_frequency * 100))
     daily_forecast['rain_chance_percent'] = rain_chance_percent
     
     hourly_forecast_data = simulate_hourly_forecast(daily_forecast)
@@ -177,8 +671,11 @@ async def get_weather_prediction_for_day(lat, lon, target_date_str):
                 {'label': 'High Temp (°C)', 'data': [round(daily_forecast['T2M_MAX'], 1), historical_averages['avg_high']]},
                 {'label': 'Low Temp (°C)', 'data': [round(daily_forecast['T2M_MIN'], 1), historical_averages['avg_low']]}
             ]
-        }
+        },
+        'historical_statistics': historical_averages,
     }
-    
+    if range_end_str:
+        dashboard_data['forecast_range'] = forecast_range_records(historical_df, path, target_date, range_end)
+
     return dashboard_data
 